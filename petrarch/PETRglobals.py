@@ -32,12 +32,19 @@
 # in more detail in the config.ini file.
 
 VerbDict = {}  # verb dictionary
+SynsetDict = {}  # indexed synsets compiled from VerbDict
+VerbMatchers = {}  # pattern tries compiled from VerbDict
 ActorDict = {}  # actor dictionary
 ActorCodes = []  # actor code list
+ActorCodeIndex = []  # date resolution of ActorCodes
+ActorTrie = {}  # word tries compiled from ActorDict
 AgentDict = {}  # agent dictionary
+AgentTrie = {}  # word tries compiled from AgentDict
 DiscardList = []  # discard list
+DiscardMatcher = []  # automaton compiled from DiscardList
 IssueList = []
 IssueCodes = []
+IssueMatcher = []  # automaton compiled from IssueList
 
 ConfigFileName = "PETR_config.ini"
 VerbFileName = ""  # verb dictionary
@@ -47,6 +54,12 @@ DiscardFileName = ""  # discard list
 TextFileList = []  # current text or validation file
 EventFileName = ""  # event output file
 IssueFileName = ""  # issues list
+DictCacheDir = ""  # compiled dictionary snapshots; not used if empty
+DictProfileFileName = ""  # dictionary profile report; profiling is off if empty
+LoadProcesses = 1  # Number of processes used to read the dictionary files
+ActorStoreName = ""  # SQLite store for the actors and agents; not used if empty
+ActorStoreCacheSize = 20000  # entries of the actor store held in memory; not used if zero
+NEPhraseCacheSize = 10000  # coded (NE phrases held in memory; not used if zero
 
 # element followed by attribute and content pairs for XML line
 AttributeList = []
@@ -55,7 +68,11 @@ AttributeList = []
 # Defaults are more or less equivalent to TABARI
 NewActorLength = 0  # Maximum length for new actors extracted from noun phrases
 RequireDyad = True  # Events require a non-null source and target
+LazyNECoding = False  # Code NE phrases only when a source or target needs them
+ParseFilter = False  # Don't parse sentences that can't produce an event
+ParseFilterShadow = False  # Parse them anyway and report how many had events
 StoponError = False  # Raise stop exception on errors rather than recovering
+CodingProcesses = 1  # Number of worker processes used by do_coding
 
 # OUTPUT OPTIONS
 WriteActorRoot = False  # Include actor root in event record
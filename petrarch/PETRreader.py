@@ -35,11 +35,18 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import io
+import array
 import re
+import gc
 import os
 import sys
 import math  # required for ordinal date calculations
+import glob
+import hashlib
 import logging
+import sqlite3
+import multiprocessing
+import collections
 import xml.etree.ElementTree as ET
 
 try:
@@ -47,6 +54,11 @@ try:
 except ImportError:
     from configparser import ConfigParser
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 import PETRglobals
 import utilities
 
@@ -69,6 +81,10 @@ CONVERTING TABARI DICTIONARIES TO PETRARCH FORMAT
 
 ErrMsgMissingDate = "<Sentence> missing required date; record was skipped"
 
+# ================== COMPILED STRUCTURES ================== #
+
+EmptyBranch = {}  # shared by all the empty branches of the compiled tries and automata: never added to
+
 
 # ================== EXCEPTIONS ================== #
 
@@ -165,6 +181,27 @@ def parse_Config(config_path):
         if parser.has_option('Dictionaries', 'issuefile_name'):
             PETRglobals.IssueFileName = parser.get('Dictionaries','issuefile_name')
 
+        if parser.has_option('Dictionaries', 'dictionary_cache'):
+            direct = parser.get('Dictionaries', 'dictionary_cache')
+            PETRglobals.DictCacheDir = os.path.expanduser(direct)
+
+        if parser.has_option('Dictionaries', 'load_processes'):
+            try:
+                PETRglobals.LoadProcesses = parser.getint('Dictionaries', 'load_processes')
+            except ValueError:
+                print("Error in config.ini Dictionaries: load_processes value must be an integer")
+                raise
+
+        if parser.has_option('Dictionaries', 'actor_store'):
+            PETRglobals.ActorStoreName = parser.get('Dictionaries', 'actor_store')
+            if parser.has_option('Dictionaries', 'actor_store_cache'):
+                try:
+                    PETRglobals.ActorStoreCacheSize = parser.getint('Dictionaries',
+                                                                    'actor_store_cache')
+                except ValueError:
+                    print("Error in config.ini Dictionaries: actor_store_cache value must be an integer")
+                    raise
+
         if parser.has_option('Options', 'new_actor_length'):
             try:
                 PETRglobals.NewActorLength = parser.getint('Options','new_actor_length')
@@ -172,10 +209,32 @@ def parse_Config(config_path):
                 print("Error in config.ini Option: new_actor_length value must be an integer")
                 raise
         print("new_actor_length =", PETRglobals.NewActorLength)
+
+        if parser.has_option('Options', 'ne_phrase_cache'):
+            try:
+                PETRglobals.NEPhraseCacheSize = parser.getint('Options','ne_phrase_cache')
+            except ValueError:
+                print("Error in config.ini Option: ne_phrase_cache value must be an integer")
+                raise
+
+        if parser.has_option('Options', 'coding_processes'):
+            try:
+                PETRglobals.CodingProcesses = parser.getint('Options','coding_processes')
+            except ValueError:
+                print("Error in config.ini Option: coding_processes value must be an integer")
+                raise
+        print("coding_processes =", PETRglobals.CodingProcesses)
+
+        if parser.has_option('Options', 'dictionary_profile'):
+            PETRglobals.DictProfileFileName = parser.get('Options', 'dictionary_profile')
+            print("dictionary_profile =", PETRglobals.DictProfileFileName)
         
         PETRglobals.StoponError = get_config_boolean('stop_on_error')
         PETRglobals.WriteActorRoot = get_config_boolean('write_actor_root')
         PETRglobals.WriteActorText = get_config_boolean('write_actor_text')
+        PETRglobals.LazyNECoding = get_config_boolean('lazy_ne_coding')
+        PETRglobals.ParseFilter = get_config_boolean('parse_filter')
+        PETRglobals.ParseFilterShadow = get_config_boolean('parse_filter_shadow')
 
         if parser.has_option('Options', 'require_dyad'):  # this one defaults to True
             PETRglobals.RequireDyad = get_config_boolean('require_dyad')
@@ -238,6 +297,11 @@ def parse_Config(config_path):
 
 # ================== PRIMARY INPUT USING FIN ================== #
 
+FIN = None  # input stream for read_FIN_line()
+FINline = ''  # last line read by read_FIN_line() or next_dictionary_line()
+FINnline = 0  # its line number in CurrentFINname
+CurrentFINname = ''
+
 
 def open_FIN(filename, descrstr):
 # opens the global input stream fin using filename;
@@ -259,6 +323,8 @@ def close_FIN():
 # IOError should only happen during debugging or if something has seriously gone wrong
 # with the system, so exit if this occurs.
     global FIN
+    if FIN is None:
+        return
     try:
         FIN.close()
     except IOError:
@@ -350,6 +416,74 @@ def read_FIN_line():
     return line
 
 
+# ================== BULK DICTIONARY INPUT ================== #
+
+SkipLinePattern = re.compile(r'#|<!|\s*$', re.UNICODE)  # lines read_FIN_line() skips
+
+
+def read_dictionary_lines(filename, descrstr):
+    """
+    Reads filename in a single operation and yields the same lines, with the same
+    comment handling, as successive calls to read_FIN_line(), as pairs
+
+            (line number, line)
+
+    The dictionary readers get these through next_dictionary_line(), which sets
+    FINnline and FINline as read_FIN_line() does; CurrentFINname is set to filename.
+    The only difference is that a <!-- comment which is not closed ends the file
+    rather than looping forever. descrstr describes the file in the error message if
+    it isn't found.
+    """
+    global FINnline, CurrentFINname
+
+    try:
+        with io.open(filename, 'r', encoding='utf-8') as fin:
+            rawlines = fin.readlines()
+    except IOError:
+        print("\aError: Could not find the", descrstr, "file:", filename)
+        print("Terminating program")
+        sys.exit()
+    CurrentFINname = filename
+    FINnline = 0
+
+    nlines = len(rawlines)
+    kline = 0
+    while kline < nlines:
+        line = rawlines[kline]
+        kline += 1
+        if SkipLinePattern.match(line):  # comment or blank line
+            continue
+        if ' #' in line:
+            line = line[:line.rfind(' #')]
+        if '<!--' in line:
+            if '-->' in line:  # just remove the substring
+                pline = line.partition('<!--')
+                line = pline[0] + pline[2][pline[2].find('-->') + 3:]
+            else:
+                # skip to the end of the comment: as in read_FIN_line(), the line
+                # following it is used without checking it for comments
+                while kline < nlines and '-->' not in rawlines[kline]:
+                    kline += 1
+                kline += 2
+                if kline > nlines:
+                    return
+                line = rawlines[kline - 1]
+        if len(line.strip()) > 0:
+            yield kline, line
+
+
+def next_dictionary_line(dictlines):
+    """
+    Returns the next line from the read_dictionary_lines() generator dictlines, or ''
+    at the end of the file, as read_FIN_line() does; FINnline and FINline are set to
+    the line number and line.
+    """
+    global FINline, FINnline
+
+    FINnline, FINline = next(dictlines, (FINnline, ''))
+    return FINline
+
+
 # ========================== TAG EVALUATION FUNCTIONS ========================== #
 
 def find_tag(tagstr):
@@ -464,9 +598,9 @@ def read_discard_list(discard_path):
 
     logger = logging.getLogger('petr_log')
     logger.info("Reading " + PETRglobals.DiscardFileName)
-    open_FIN(discard_path, "discard")
+    dictlines = read_dictionary_lines(discard_path, "discard")
 
-    line = read_FIN_line()
+    line = next_dictionary_line(dictlines)
     while len(line) > 0:  # loop through the file
         if '#' in line:
             line = line[:line.find('#')]
@@ -476,9 +610,79 @@ def read_discard_list(discard_path):
         else:
             targ = ' ' + targ
         PETRglobals.DiscardList.append(targ.upper())  # case insensitive match
-        line = read_FIN_line()
-    close_FIN()
+        line = next_dictionary_line(dictlines)
 # 	print PETRglobals.DiscardList[:8]
+    compile_discard_list()
+
+
+def make_text_automaton(strings):
+    """
+    Compiles the list strings into an Aho-Corasick automaton so that all of them can be
+    located with a single pass through a text by petrarch.scan_text_automaton().
+    Returns [goto, fail, output, lengths] where for each state goto is a dictionary from
+    the next character to the next state -- EmptyBranch if there are none -- fail is the
+    state to fall back to when there is no such character, and output is a tuple of the
+    indices of the strings ending at the state; lengths are the lengths of the strings.
+    State 0 is the root.
+    """
+    goto = [{}]
+    fail = [0]
+    output = [[]]
+    for kstr, targ in enumerate(strings):
+        state = 0
+        for ch in targ:
+            if goto[state] is EmptyBranch:
+                goto[state] = {}
+            if ch not in goto[state]:
+                goto[state][ch] = len(goto)
+                goto.append(EmptyBranch)
+                fail.append(0)
+                output.append([])
+            state = goto[state][ch]
+        output[state].append(kstr)
+
+    queue = collections.deque(goto[0].values())  # breadth-first, so fail states are done
+    while queue:
+        state = queue.popleft()
+        for ch, nextstate in goto[state].items():
+            queue.append(nextstate)
+            failstate = fail[state]
+            while failstate > 0 and ch not in goto[failstate]:
+                failstate = fail[failstate]
+            fail[nextstate] = goto[failstate].get(ch, 0)
+            output[nextstate].extend(output[fail[nextstate]])
+
+    return [goto, fail, [tuple(item) for item in output],
+            [len(targ) for targ in strings]]
+
+
+def compile_discard_list():
+    """
+    Compiles PETRglobals.DiscardList into PETRglobals.DiscardMatcher, which is used by
+    check_discards(). This is a list
+
+            [automaton, targets]
+
+    where automaton is made by make_text_automaton() from the match strings -- the
+    entries without the '+' prefix and final '_' -- and targets[k] is the list of
+    indices in DiscardList of the entries with the kth match string.
+    """
+    strings = []
+    targets = []
+    stringindex = {}
+    for kdisc, target in enumerate(PETRglobals.DiscardList):
+        if target[0] == '+':
+            mtarg = target[1:]
+        else:
+            mtarg = target
+        if target[-1] == '_':
+            mtarg = mtarg[:-1]
+        if mtarg not in stringindex:
+            stringindex[mtarg] = len(strings)
+            strings.append(mtarg)
+            targets.append([])
+        targets[stringindex[mtarg]].append(kdisc)
+    PETRglobals.DiscardMatcher = [make_text_automaton(strings), targets]
 
 
 def read_issue_list(issue_path):
@@ -546,12 +750,12 @@ def read_issue_list(issue_path):
     """
     logger = logging.getLogger('petr_log')
     logger.info("Reading " + PETRglobals.IssueFileName)
-    open_FIN(issue_path, "issues")
+    dictlines = read_dictionary_lines(issue_path, "issues")
 
     PETRglobals.IssueCodes.append('~')  # initialize the ignore codes
     PETRglobals.IssueCodes.append('~~')
 
-    line = read_FIN_line()
+    line = next_dictionary_line(dictlines)
     while len(line) > 0:  # loop through the file
         if '#' in line:
             line = line[:line.find('#')]
@@ -564,7 +768,7 @@ def read_issue_list(issue_path):
                 codeindex = 0
         else:
             if '[' not in line:  # just do the codes now
-                line = read_FIN_line()
+                line = next_dictionary_line(dictlines)
                 continue
             code = line[line.find('[') + 1:line.find(']')]  # get the code
             if code in PETRglobals.IssueCodes:
@@ -616,8 +820,8 @@ def read_issue_list(issue_path):
 
         for item in forms:
             PETRglobals.IssueList.append(tuple([' ' + item + ' ', codeindex]))
-        line = read_FIN_line()
-    close_FIN()
+        line = next_dictionary_line(dictlines)
+    compile_issue_list()
 
     """ debug
 	ka = 0
@@ -626,6 +830,32 @@ def read_issue_list(issue_path):
 		ka += 1
 	"""
 
+
+def compile_issue_list():
+    """
+    Compiles PETRglobals.IssueList into PETRglobals.IssueMatcher, which is used by
+    get_issues(). This is a list
+
+            [automaton, targets, ignores]
+
+    where automaton is made by make_text_automaton() from the distinct phrases,
+    targets[k] is the list of indices in IssueList of the entries with the kth phrase
+    and ignores is the set of phrases which have an ignore ('~') code.
+    """
+    strings = []
+    targets = []
+    ignores = set()
+    stringindex = {}
+    for kissue, target in enumerate(PETRglobals.IssueList):
+        if target[0] not in stringindex:
+            stringindex[target[0]] = len(strings)
+            strings.append(target[0])
+            targets.append([])
+        targets[stringindex[target[0]]].append(kissue)
+        if PETRglobals.IssueCodes[target[1]][0] == '~':
+            ignores.add(stringindex[target[0]])
+    PETRglobals.IssueMatcher = [make_text_automaton(strings), targets, ignores]
+
 # ================== VERB DICTIONARY INPUT ================== #
 
 
@@ -956,12 +1186,12 @@ def read_verb_dictionary(verb_path):
     # note that this will be ignored if there are no errors
     logger = logging.getLogger('petr_log')
     logger.info("Reading " + PETRglobals.VerbFileName)
-    open_FIN(verb_path, "verb")
+    dictlines = read_dictionary_lines(verb_path, "verb")
 
     theverb = ''
     newblock = False
     ka = 0   # primary verb count ( debug )
-    line = read_FIN_line()
+    line = next_dictionary_line(dictlines)
     while len(line) > 0:  # loop through the file
         if '[' in line:
             part = line.partition('[')
@@ -980,12 +1210,12 @@ def read_verb_dictionary(verb_path):
             else:
                 primarycode = '---'
             newblock = True
-            line = read_FIN_line()
+            line = next_dictionary_line(dictlines)
 
         elif verb[0] == '-':   # pattern
             # TABARI legacy: currently aren't processing these
             if '{' in verb:
-                line = read_FIN_line()
+                line = next_dictionary_line(dictlines)
                 continue
 #           print 'RVD-1',verb
             # resolve the ambiguous '_ ' construction to ' '
@@ -1007,7 +1237,7 @@ def read_verb_dictionary(verb_path):
             except ValueError:
                 # just trap the error, which will skip the line containing it
                 pass
-            line = read_FIN_line()
+            line = next_dictionary_line(dictlines)
 
         elif verb[0] == '&':  # Read and store a synset.
             if verb[-2] == '_':
@@ -1017,7 +1247,7 @@ def read_verb_dictionary(verb_path):
                 noplural = False
                 verb = verb[:-1]  # remove final blank
             PETRglobals.VerbDict[verb] = []
-            line = read_FIN_line()
+            line = next_dictionary_line(dictlines)
             while line[0] == '+':
                 wordstr = line[1:].strip()
                 if noplural or wordstr[-1] == '_':
@@ -1030,7 +1260,7 @@ def read_verb_dictionary(verb_path):
                     wordstr = wordstr.replace('_', ' ')
                     PETRglobals.VerbDict[verb].append(wordstr)
                     PETRglobals.VerbDict[verb].append(make_plural(wordstr))
-                line = read_FIN_line()
+                line = next_dictionary_line(dictlines)
 #           print "rvd/gs:",verb, PETRglobals.VerbDict[verb]
 
         else:  # verb
@@ -1058,10 +1288,133 @@ def read_verb_dictionary(verb_path):
                     make_verb_forms(curcode)
             ka += 1   # counting primary verbs
 #           if ka > 16: return
-            line = read_FIN_line()
+            line = next_dictionary_line(dictlines)
 
 #       print "--:",line,
-    close_FIN()
+    compile_synsets()
+    compile_verb_patterns()
+
+
+def make_verb_pattern_trie(patterns):
+    """
+    Compiles a list of upper or lower verb patterns -- the alternating connector and
+    word lists stored in VerbDict -- into a trie which is searched by
+    petrarch.match_verb_trie(). Identical patterns are stored once; returns
+
+            [trie, patternindex]
+
+    where patternindex[k] is the index in the trie of patterns[k]. The trie is a list
+
+            [root, npatterns, emptyindex]
+
+    where emptyindex is the list of indices of the zero-length patterns, which match
+    anything. Each node is a list
+
+            [indices, ends, gap, consecutive, tokens]
+
+    where indices are the patterns passing through the node and ends are the ones
+    ending there. gap and consecutive are dictionaries keyed on the next word for the
+    ' ' and '_' connectors; tokens is keyed on (connector, word) for the words which
+    are not compared directly: $, +, %, ^ and other single-character tokens, synsets
+    and empty words. Empty branches are EmptyBranch.
+
+    A pattern is stored as the (connector, word) pairs which verb_pattern_match()
+    looks at, so this also handles the multi-word verb entries that share the pattern
+    list.
+    """
+    root = [[], [], EmptyBranch, EmptyBranch, EmptyBranch]
+    emptyindex = []
+    keyindex = {}
+    patternindex = []
+    for patlist in patterns:
+        if len(patlist) == 0:
+            key = None
+        else:
+            key = tuple([(patlist[ka - 1], patlist[ka])
+                         for ka in range(1, len(patlist), 2)])
+        if key in keyindex:
+            patternindex.append(keyindex[key])
+            continue
+        kpat = len(keyindex)
+        keyindex[key] = kpat
+        patternindex.append(kpat)
+        if key is None:
+            emptyindex.append(kpat)
+            continue
+        node = root
+        node[0].append(kpat)
+        for connector, word in key:
+            if len(word) < 2 or word[0] == '&':
+                kbranch = 4
+                word = (connector, word)
+            elif connector == ' ':
+                kbranch = 2
+            else:
+                kbranch = 3
+            if node[kbranch] is EmptyBranch:
+                node[kbranch] = {}
+            if word not in node[kbranch]:
+                node[kbranch][word] = [[], [], EmptyBranch, EmptyBranch, EmptyBranch]
+            node = node[kbranch][word]
+            node[0].append(kpat)
+        node[1].append(kpat)
+    return [[root, len(keyindex), emptyindex], patternindex]
+
+
+def compile_synsets():
+    """
+    Compiles the synsets in VerbDict into PETRglobals.SynsetDict, which is used by
+    petrarch.match_synset(). This is keyed on the synset label and each entry is a list
+
+            [words, phrases, upperphrases, openmatch]
+
+    where words is the set of single-word members, phrases is a dictionary from the
+    first word of each multi-word member to the list of those members as tuples of
+    words, and upperphrases is the same keyed on the last word, with the tuples
+    reversed for matching in the upper sequence. The phrase lists are in the order of
+    the synset. openmatch is True if the synset has a member with no words -- e.g.
+    '+_' -- which matches anything, so the members following it are never reached.
+    """
+    PETRglobals.SynsetDict = {}
+    for label, members in PETRglobals.VerbDict.items():
+        if label[0] != '&':
+            continue
+        words = set()
+        phrases = {}
+        upperphrases = {}
+        openmatch = False
+        for member in members:
+            if ' ' not in member:
+                words.add(member)
+            elif not openmatch:
+                wordlist = member.split()
+                if len(wordlist) == 0:
+                    openmatch = True
+                    continue
+                phrases.setdefault(wordlist[0], []).append(tuple(wordlist))
+                wordlist.reverse()
+                upperphrases.setdefault(wordlist[0], []).append(tuple(wordlist))
+        PETRglobals.SynsetDict[label] = [words, phrases, upperphrases, openmatch]
+
+
+def compile_verb_patterns():
+    """
+    Compiles the pattern lists of VerbDict into PETRglobals.VerbMatchers, which is
+    used by check_verbs(). This is keyed on the primary verbs and each entry is a list
+
+            [uppertrie, lowertrie, entries]
+
+    where the tries are made by make_verb_pattern_trie() from the upper and lower
+    patterns and entries[k] is the pair of trie indices for VerbDict[verb][k + 2].
+    """
+    PETRglobals.VerbMatchers = {}
+    for verb, patternlist in PETRglobals.VerbDict.items():
+        if verb[0] == '&' or not patternlist[0] or len(patternlist) < 3:
+            continue
+        upper = make_verb_pattern_trie([entry[0] for entry in patternlist[2:]])
+        lower = make_verb_pattern_trie([entry[1] for entry in patternlist[2:]])
+        PETRglobals.VerbMatchers[verb] = [upper[0], lower[0],
+                                          list(zip(upper[1], lower[1]))]
 
 
 def show_verb_dictionary(filename=''):
@@ -1101,9 +1454,13 @@ def show_verb_dictionary(filename=''):
 # ================== ACTOR DICTIONARY INPUT ================== #
 
 
+NounWords = {}  # words and (word, connector) pairs read by make_noun_list()
+
+
 def make_noun_list(nounst):
 # parses a noun string -- actor, agent or agent plural -- and returns in a list which
-# has the keyword and initial connector in the first tuple
+# has the keyword and initial connector in the first tuple. The words and tuples are
+# shared through NounWords, which compact_dictionary() clears once the file is read
     nounlist = []
     start = 0
     maxlen = len(nounst) + 1  # this is just a telltail
@@ -1117,14 +1474,134 @@ def make_noun_list(nounst):
         # <13.06.05> not sure we need this check...well, I just need the terminating point, still need to see which is lower
         if unfind < spfind:
             # this won't change, so use a tuple
-            nounlist.append((nounst[start:unfind], '_'))
+            word = nounst[start:unfind]
+            pair = (NounWords.setdefault(word, word), '_')
             start = unfind + 1
         else:
-            nounlist.append((nounst[start:spfind], ' '))
+            word = nounst[start:spfind]
+            pair = (NounWords.setdefault(word, word), ' ')
             start = spfind + 1
+        nounlist.append(NounWords.setdefault(pair, pair))
     return nounlist
 
 
+def make_phrase_trie(patlist):
+    """
+    Compiles a list of actor or agent patterns -- as stored in ActorDict or AgentDict,
+    sorted by length -- into a word trie which is searched by
+    petrarch.match_phrase_trie(). Each node is a list
+
+            [rank, minrank, consecutive, gap]
+
+    where rank is the index in patlist of the first pattern ending at the node (None
+    if no pattern ends there), minrank is the lowest rank in the subtree, and
+    consecutive and gap are dictionaries keyed on the next word of the pattern for the
+    '_' and ' ' connectors respectively; empty branches are EmptyBranch. The first word
+    is the dictionary key, so patterns consisting of only that word end at the root.
+
+    The words stored are the ones actor_phrase_match() actually compares: that routine
+    treats the final element of a pattern as the terminator, so the last word of a
+    pattern of three or more words without a trailing '_' is not checked.
+    """
+    trie = [None, 0, EmptyBranch, EmptyBranch]
+    for rank, phlist in enumerate(patlist):
+        if len(phlist) == 2 or (len(phlist) == 3 and phlist[2][0] == ""):
+            words = []  # root word is a sufficient match
+        else:
+            words = phlist[2:max(3, len(phlist) - 1)]
+        node = trie
+        connector = phlist[1]
+        for word, nextconn in words:
+            if connector == '_':
+                kbranch = 2
+            else:
+                kbranch = 3
+            if node[kbranch] is EmptyBranch:
+                node[kbranch] = {}
+            if word not in node[kbranch]:
+                node[kbranch][word] = [None, rank, EmptyBranch, EmptyBranch]
+            node = node[kbranch][word]
+            connector = nextconn
+        if node[0] is None:
+            node[0] = rank
+    return trie
+
+
+def make_phrase_tries(thedict, thetrie, keylist):
+    """ Rebuilds the entries of thetrie for keylist from the pattern lists in thedict. """
+    for lockey in keylist:
+        thetrie[lockey] = make_phrase_trie(thedict[lockey])
+
+
+def resolve_actor_code(codelist, orddate):
+    """
+    Returns the code in the ActorCodes entry codelist for the ordinal date orddate:
+    the first date restriction satisfied by orddate or, failing that, the last
+    unrestricted code. Returns None if there is no code.
+    """
+    thecode = None
+    if len(codelist) == 1 and len(codelist[0]) == 1:
+        thecode = codelist[0][0]  # no restrictions: the most common case
+    for item in codelist:
+        if len(item) > 1:  # interval date restriction
+            if item[0] == 0 and orddate <= item[1]:
+                thecode = item[2]
+                break
+            if item[0] == 1 and orddate >= item[1]:
+                thecode = item[2]
+                break
+            if item[0] == 2 and orddate >= item[1] and orddate <= item[2]:
+                thecode = item[3]
+                break
+    # if interval search failed, look for an unrestricted code
+    if not thecode:
+        for item in codelist:  # with WriteActorRoot, the actor name at the end of the list will have length > 1
+            if len(item) == 1:
+                thecode = item[0]
+    if not thecode:
+        return None
+    return thecode
+
+
+def compile_actor_codes():
+    """
+    Extends PETRglobals.ActorCodeIndex, which parallels ActorCodes, to cover the entries
+    added to ActorCodes since the last call. This is used by petrarch.get_actor_code().
+    An entry is the result of resolve_actor_code() if the entry has no date
+    restrictions, otherwise it is a tuple
+
+            (startdates, codes)
+
+    where startdates is the sorted list of the ordinal dates at which the result can
+    change, codes[0] is the code before startdates[0] and codes[k + 1] is the code from
+    startdates[k] up to the next start date, so the code for a date is found with
+    bisect_right(startdates, orddate).
+    """
+    for codelist in PETRglobals.ActorCodes[len(PETRglobals.ActorCodeIndex):]:
+        startdates = set()
+        for item in codelist:
+            if len(item) > 1:
+                if item[0] == 0:
+                    startdates.add(item[1] + 1)
+                elif item[0] == 1:
+                    startdates.add(item[1])
+                elif item[0] == 2:
+                    startdates.add(item[1])
+                    startdates.add(item[2] + 1)
+        if len(startdates) == 0:
+            PETRglobals.ActorCodeIndex.append(resolve_actor_code(codelist, None))
+            continue
+        startdates = sorted(startdates)
+        codes = [resolve_actor_code(codelist, startdates[0] - 1)]
+        for orddate in startdates:
+            codes.append(resolve_actor_code(codelist, orddate))
+        PETRglobals.ActorCodeIndex.append((tuple(startdates), tuple(codes)))
+
+
+OrdDateCache = {}  # memo of dstr_to_ordate(); cleared when it reaches OrdDateCacheSize
+OrdDateCacheSize = 10000
+
+
 def dstr_to_ordate(datestring):
     """ Computes an ordinal date from a Gregorian calendar date string YYYYMMDD or YYMMDD."""
     """
@@ -1158,6 +1635,8 @@ def dstr_to_ordate(datestring):
 	"""
 
 # print datestring        # debug
+    if datestring in OrdDateCache:
+        return OrdDateCache[datestring]
     try:
         if len(datestring) > 7:
             year = int(datestring[:4])
@@ -1211,7 +1690,11 @@ def dstr_to_ordate(datestring):
     ordate -= 2305813   # adjust for ANSI date
 
 # print ordate        # debug
-    return int(ordate)
+    ordate = int(ordate)
+    if len(OrdDateCache) >= OrdDateCacheSize:
+        OrdDateCache.clear()
+    OrdDateCache[datestring] = ordate
+    return ordate
 
 
 def read_actor_dictionary(actorfile):
@@ -1326,14 +1809,16 @@ def read_actor_dictionary(actorfile):
 
     logger = logging.getLogger('petr_log')
     logger.info("Reading " + actorfile)
-    open_FIN(actorfile, "actor")
+    dictlines = read_dictionary_lines(actorfile, "actor")
 
     # location where codes for current actor will be stored
     codeindex = len(PETRglobals.ActorCodes)
     # list of codes -- default and date restricted -- for current actor
     curlist = []
+    # keys added or extended by this file
+    keylist = set()
 
-    line = read_FIN_line()
+    line = next_dictionary_line(dictlines)
     while len(line) > 0:  # loop through the file
         if '---STOP---' in line:
             break
@@ -1343,7 +1828,7 @@ def read_actor_dictionary(actorfile):
                 brack = line.index('[')
             except ValueError:
                 logger.warning(dateerrorstr)
-                line = read_FIN_line()
+                line = next_dictionary_line(dictlines)
                 continue
             part = line[brack + 1:].strip().partition(' ')
             code = part[0].strip()
@@ -1363,7 +1848,7 @@ def read_actor_dictionary(actorfile):
                     ord = dstr_to_ordate(rest[ka:kb])
                 except DateError:
                     logger.warning(dateerrorstr)
-                    line = read_FIN_line()
+                    line = next_dictionary_line(dictlines)
                     continue
 
                 if rest[0] == '<':
@@ -1380,12 +1865,12 @@ def read_actor_dictionary(actorfile):
                     ord2 = dstr_to_ordate(pt2)
                 except DateError:
                     logger.warning(dateerrorstr)
-                    line = read_FIN_line()
+                    line = next_dictionary_line(dictlines)
                     continue
                 if ord2 < ord1:
                     logger.warning(
                         "End date in interval date restriction is less than starting date; line skipped")
-                    line = read_FIN_line()
+                    line = next_dictionary_line(dictlines)
                     continue
                 curlist.append([2, ord1, ord2, code])
             else:  # replace default code
@@ -1427,18 +1912,20 @@ def read_actor_dictionary(actorfile):
                 PETRglobals.ActorDict[keyword].append(phlist)
             else:
                 PETRglobals.ActorDict[keyword] = [phlist]
+            keylist.add(keyword)
             if isinstance(phlist[0], str):
                 # save location of the list if this is a primary phrase
                 curlist = PETRglobals.ActorDict[keyword]
 
-        line = read_FIN_line()
+        line = next_dictionary_line(dictlines)
 
-    close_FIN()
 #    <14.11.20: does this need to save the final entry? >
 
     # sort the patterns by the number of words
     for lockey in list(PETRglobals.ActorDict.keys()):
         PETRglobals.ActorDict[lockey].sort(key=len, reverse=True)
+    make_phrase_tries(PETRglobals.ActorDict, PETRglobals.ActorTrie, keylist)
+    compile_actor_codes()
 
 
 def show_actor_dictionary(filename=''):
@@ -1619,19 +2106,19 @@ def read_agent_dictionary(agent_path):
     # note that this will be ignored if there are no errors
     logger = logging.getLogger('petr_log')
     logger.info("Reading " + PETRglobals.AgentFileName + "\n")
-    open_FIN(agent_path, "agent")
+    dictlines = read_dictionary_lines(agent_path, "agent")
 
-    line = read_FIN_line()
+    line = next_dictionary_line(dictlines)
     while len(line) > 0:  # loop through the file
 
         if '!' in line and '=' in line:  # synonym set
             define_marker(line)
-            line = read_FIN_line()
+            line = next_dictionary_line(dictlines)
             continue
 
         if '[' not in line:  # code specified?
             logger.warning(codeerrorstr + enderrorstr)
-            line = read_FIN_line()
+            line = next_dictionary_line(dictlines)
             continue
 
         part = line.partition('[')
@@ -1642,7 +2129,7 @@ def read_agent_dictionary(agent_path):
         elif '{' in part[0]:
             if '}' not in part[0]:
                 logger.warning(brackerrorstr + enderrorstr)
-                line = read_FIN_line()
+                line = next_dictionary_line(dictlines)
                 continue
             agent = part[0][:part[0].find('{')].strip() + ' '
             # this will automatically set the null case
@@ -1660,13 +2147,14 @@ def read_agent_dictionary(agent_path):
         if len(plural) > 0:
             store_agent(plural + ' ', code)
 
-        line = read_FIN_line()
+        line = next_dictionary_line(dictlines)
 
-    close_FIN()
 
     # sort the patterns by the number of words
     for lockey in list(PETRglobals.AgentDict.keys()):
         PETRglobals.AgentDict[lockey].sort(key=len, reverse=True)
+    make_phrase_tries(PETRglobals.AgentDict, PETRglobals.AgentTrie,
+                      PETRglobals.AgentDict.keys())
 
 
 def show_AgentDict(filename=''):
@@ -1686,6 +2174,633 @@ def show_AgentDict(filename=''):
             print(locword, "::")
             print(loclist)
 
+# ================== COMPILED DICTIONARY CACHE ================== #
+
+"""
+Reading the dictionary text files is the bulk of the startup time, so
+read_dictionary() saves the structures produced from each file as a pickled
+snapshot in PETRglobals.DictCacheDir and loads this on later runs. Snapshots are
+stored per file and are keyed on
+
+    -- the SHA-1 hash of the file contents
+    -- the config options that change what the reader produces (WriteActorRoot)
+    -- DictCacheVersion, which should be incremented whenever the internal format
+       of the dictionaries changes
+
+so editing one of the files only causes that file to be read again. A new snapshot
+replaces the older ones of the same file with the same options, while snapshots
+made with other options are kept. Each snapshot
+holds only what that file contributed -- the reader is run against empty globals --
+and this is merged into PETRglobals, so ActorCodes indices in an actor snapshot are
+relative to the start of that file.
+"""
+
+DictCacheVersion = '8'
+
+# PETRglobals structures set by each of the dictionary readers
+DictionaryGlobals = {'verb': ['VerbDict', 'SynsetDict', 'VerbMatchers'],
+                     'actor': ['ActorDict', 'ActorCodes', 'ActorCodeIndex', 'ActorTrie'],
+                     'agent': ['AgentDict', 'AgentTrie'],
+                     'discard': ['DiscardList', 'DiscardMatcher'],
+                     'issue': ['IssueList', 'IssueCodes', 'IssueMatcher']}
+
+DictionaryReaders = {'verb': read_verb_dictionary,
+                     'actor': read_actor_dictionary,
+                     'agent': read_agent_dictionary,
+                     'discard': read_discard_list,
+                     'issue': read_issue_list}
+
+
+def get_dictionary_options(kind):
+    """
+    Returns the part of the cache key that does not depend on the file contents:
+    snapshots of a file are only replaced by ones with the same options.
+    """
+    options = [DictCacheVersion, kind, str(sys.version_info[0])]
+    if kind == 'actor':
+        options.append(str(PETRglobals.WriteActorRoot))
+    return hashlib.sha1('|'.join(options).encode('utf-8')).hexdigest()[:12]
+
+
+def get_dictionary_key(kind, filepath):
+    """ Returns the cache key for a dictionary file: see note above """
+    try:
+        with open(filepath, 'rb') as fin:
+            filehash = hashlib.sha1(fin.read()).hexdigest()
+    except IOError:
+        print("\aError: Could not find the", kind, "file:", filepath)
+        print("Terminating program")
+        sys.exit()
+    options = [get_dictionary_options(kind), filehash]
+    return hashlib.sha1('|'.join(options).encode('utf-8')).hexdigest()
+
+
+def read_dictionary_fragment(kind, filepath):
+    """
+    Runs the reader for kind on filepath against empty PETRglobals structures and
+    returns a list of the structures it produced, in the order of
+    DictionaryGlobals[kind]. PETRglobals is left unchanged.
+    """
+    names = DictionaryGlobals[kind]
+    saved = [getattr(PETRglobals, name) for name in names]
+    for name, value in zip(names, saved):
+        setattr(PETRglobals, name, type(value)())
+    try:
+        DictionaryReaders[kind](filepath)
+        compact_dictionary(kind)
+        fragment = [getattr(PETRglobals, name) for name in names]
+    finally:
+        for name, value in zip(names, saved):
+            setattr(PETRglobals, name, value)
+    return fragment
+
+
+def merge_dictionary_fragment(kind, fragment):
+    """
+    Adds the structures from read_dictionary_fragment() to PETRglobals. The result is
+    the same as running the reader directly: actor code indices are offset by the
+    current length of ActorCodes and the actor and agent pattern lists are re-sorted
+    by length -- and their tries rebuilt -- when a key was already present.
+    """
+    if kind == 'verb':
+        PETRglobals.VerbDict.update(fragment[0])
+        PETRglobals.SynsetDict.update(fragment[1])
+        PETRglobals.VerbMatchers.update(fragment[2])
+
+    elif kind == 'actor' or kind == 'agent':
+        if kind == 'actor':
+            thedict = PETRglobals.ActorDict
+            thetrie = PETRglobals.ActorTrie
+            offset = len(PETRglobals.ActorCodes)
+        else:
+            thedict = PETRglobals.AgentDict
+            thetrie = PETRglobals.AgentTrie
+            offset = 0
+        fragtrie = fragment[-1]
+        for lockey, patlist in fragment[0].items():
+            if offset > 0:
+                patlist = [(phlist[0] + offset,) + phlist[1:] for phlist in patlist]
+            if lockey in thedict:
+                thedict[lockey].extend(patlist)
+                thedict[lockey].sort(key=len, reverse=True)
+                make_phrase_tries(thedict, thetrie, [lockey])
+            else:
+                thedict[lockey] = patlist
+                thetrie[lockey] = fragtrie[lockey]
+        if kind == 'actor':
+            PETRglobals.ActorCodes.extend(fragment[1])
+            PETRglobals.ActorCodeIndex.extend(fragment[2])
+
+    elif kind == 'discard':
+        if len(PETRglobals.DiscardList) > 0:
+            PETRglobals.DiscardList.extend(fragment[0])
+            compile_discard_list()
+        else:
+            PETRglobals.DiscardList.extend(fragment[0])
+            PETRglobals.DiscardMatcher = fragment[1]
+
+    elif kind == 'issue':
+        offset = len(PETRglobals.IssueCodes)
+        for target, codeindex in fragment[0]:
+            PETRglobals.IssueList.append((target, codeindex + offset))
+        PETRglobals.IssueCodes.extend(fragment[1])
+        if offset > 0:
+            compile_issue_list()
+        else:
+            PETRglobals.IssueMatcher = fragment[2]
+
+
+def read_dictionary(kind, filepath):
+    """
+    Reads the dictionary file filepath, where kind is one of the keys of
+    DictionaryReaders, and adds it to PETRglobals. If PETRglobals.DictCacheDir is set,
+    a current snapshot of the file is loaded instead of reading it, and a new snapshot
+    is written when the file has to be read.
+    """
+    merge_dictionary_fragment(kind, load_dictionary_fragment(kind, filepath))
+
+
+def load_dictionary_fragment(kind, filepath, cachedonly=False):
+    """
+    Returns the structures for the dictionary file filepath, as produced by
+    read_dictionary_fragment(), using and updating the snapshots in
+    PETRglobals.DictCacheDir if this is set. If cachedonly is True, returns None rather
+    than reading a file that has no current snapshot.
+    """
+    logger = logging.getLogger('petr_log')
+    if not PETRglobals.DictCacheDir:
+        if cachedonly:
+            return None
+        return read_dictionary_fragment(kind, filepath)
+
+    prefix = os.path.join(PETRglobals.DictCacheDir,
+                          os.path.basename(filepath) + '.' + kind + '.' +
+                          get_dictionary_options(kind) + '.')
+    cachefile = prefix + get_dictionary_key(kind, filepath) + '.pickle'
+    fragment = None
+    if os.path.exists(cachefile):
+        try:
+            # the snapshots hold millions of small objects: reading the file in one
+            # go and not running the cyclic collector over them halves the load time
+            with open(cachefile, 'rb') as fin:
+                data = fin.read()
+            gcenabled = gc.isenabled()
+            gc.disable()
+            try:
+                fragment = pickle.loads(data)
+            finally:
+                if gcenabled:
+                    gc.enable()
+            logger.info("Loaded " + filepath + " from " + cachefile)
+        except Exception:
+            logger.warning("Could not load dictionary snapshot " + cachefile)
+            fragment = None
+
+    if fragment is None and not cachedonly:
+        fragment = read_dictionary_fragment(kind, filepath)
+        try:
+            if not os.path.isdir(PETRglobals.DictCacheDir):
+                os.makedirs(PETRglobals.DictCacheDir)
+            for oldfile in glob.glob(prefix + '*.pickle'):  # remove stale snapshots
+                os.remove(oldfile)
+            tempfile = cachefile + '.' + str(os.getpid())
+            with open(tempfile, 'wb') as fout:
+                pickle.dump(fragment, fout, pickle.HIGHEST_PROTOCOL)
+            os.rename(tempfile, cachefile)
+        except (IOError, OSError):
+            logger.warning("Could not write dictionary snapshot " + cachefile)
+
+    return fragment
+
+
+def load_dictionary_task(task):
+    """ Pool worker for read_dictionary_list(): task is a (kind, filepath) pair """
+    return load_dictionary_fragment(task[0], task[1])
+
+
+def read_dictionary_list(filelist):
+    """
+    Reads the dictionary files in filelist, a list of (kind, filepath) pairs, with the
+    same result as calling read_dictionary() on each in turn. Files with a current
+    snapshot are loaded directly; the rest are read at the same time, the largest in
+    this process and the others by a pool of up to PETRglobals.LoadProcesses - 1
+    processes, and the results are merged in the order of filelist, which sets the
+    ActorCodes offsets. The files are read one at a time if LoadProcesses or the
+    number of CPUs is 1, or on platforms without fork().
+    """
+    fragments = [load_dictionary_fragment(kind, filepath, True)
+                 for kind, filepath in filelist]
+    tasks = [ka for ka in range(len(filelist)) if fragments[ka] is None]
+    nproc = min(PETRglobals.LoadProcesses, len(tasks), multiprocessing.cpu_count())
+    if nproc < 2 or not hasattr(os, 'fork'):
+        for ka in tasks:
+            fragments[ka] = load_dictionary_fragment(*filelist[ka])
+    else:
+        for kind, filepath in [filelist[ka] for ka in tasks]:
+            if not os.path.isfile(filepath):  # report this here rather than in a worker
+                print("\aError: Could not find the", kind, "file:", filepath)
+                print("Terminating program")
+                sys.exit()
+        # the largest file is read here, as the results of the workers have to be
+        # pickled back, which takes about half as long as reading the file
+        tasks.sort(key=lambda ka: os.path.getsize(filelist[ka][1]), reverse=True)
+        pool = multiprocessing.Pool(nproc - 1)
+        try:
+            results = pool.map_async(load_dictionary_task,
+                                     [filelist[ka] for ka in tasks[1:]], 1)
+            fragments[tasks[0]] = load_dictionary_fragment(*filelist[tasks[0]])
+            results = results.get()
+        finally:
+            pool.close()
+            pool.join()
+        for ka, fragment in zip(tasks[1:], results):
+            fragments[ka] = fragment
+    gcenabled = gc.isenabled()
+    gc.disable()  # the merge only adds to the structures: see load_dictionary_fragment()
+    try:
+        for (kind, filepath), fragment in zip(filelist, fragments):
+            merge_dictionary_fragment(kind, fragment)
+    finally:
+        if gcenabled:
+            gc.enable()
+
+
+# ================== ACTOR STORE ================== #
+
+"""
+For machines that cannot hold all of the actor dictionaries in memory, the actor and
+agent dictionaries can instead be kept in an SQLite database, PETRglobals.ActorStoreName,
+which is read as words are encountered. open_actor_store() builds the database from the
+dictionary files when it is missing or out of date -- this needs the memory of a normal
+run, so the file can be built elsewhere and copied -- and the coding then only holds
+the entries in ActorStoreCache, the PETRglobals.ActorStoreCacheSize most recently used.
+
+The database has the tables
+
+    phrases (kind, word, entry) : kind is 'actor' or 'agent' and entry is the pickled
+                                  pair (ActorTrie[word], ActorDict[word]), or the same
+                                  for the agents
+    codes (idx, entry)          : entry is the pickled pair (ActorCodeIndex[idx], root),
+                                  where root is the actor root if WriteActorRoot is set
+    info (name, value)          : 'key' is the hash of the dictionary cache keys of the
+                                  files, so the store is rebuilt when any of them change
+"""
+
+ActorStorePath = ''  # set by open_actor_store(); the actors are in PETRglobals if empty
+ActorStoreConnection = None
+ActorStorePid = 0  # process that opened ActorStoreConnection: see get_store_entry()
+ActorStoreCache = collections.OrderedDict()
+
+
+def get_actor_store_key(actorpaths, agentpath):
+    """ Returns the key of the store built from actorpaths and agentpath """
+    keys = [get_dictionary_key('actor', actorpath) for actorpath in actorpaths]
+    keys.append(get_dictionary_key('agent', agentpath))
+    return hashlib.sha1('|'.join(keys).encode('utf-8')).hexdigest()
+
+
+def write_actor_store(storepath, storekey):
+    """
+    Writes the actor and agent dictionaries in PETRglobals to a new store at storepath;
+    the file is only replaced once it is complete.
+    """
+    tempfile = storepath + '.' + str(os.getpid())
+    if os.path.exists(tempfile):
+        os.remove(tempfile)
+    conn = sqlite3.connect(tempfile)
+    conn.execute('CREATE TABLE phrases (kind TEXT, word TEXT, entry BLOB, '
+                 'PRIMARY KEY (kind, word))')
+    conn.execute('CREATE TABLE codes (idx INTEGER PRIMARY KEY, entry BLOB)')
+    conn.execute('CREATE TABLE info (name TEXT PRIMARY KEY, value TEXT)')
+    for kind, thedict, thetrie in [('actor', PETRglobals.ActorDict, PETRglobals.ActorTrie),
+                                   ('agent', PETRglobals.AgentDict, PETRglobals.AgentTrie)]:
+        conn.executemany('INSERT INTO phrases VALUES (?, ?, ?)',
+                         ((kind, word, sqlite3.Binary(pickle.dumps((thetrie[word], patlist),
+                                                                   pickle.HIGHEST_PROTOCOL)))
+                          for word, patlist in thedict.items()))
+    rows = []
+    for kcode, resolved in enumerate(PETRglobals.ActorCodeIndex):
+        if PETRglobals.WriteActorRoot:
+            root = PETRglobals.ActorCodes[kcode][-1]
+        else:
+            root = None
+        rows.append((kcode, sqlite3.Binary(pickle.dumps((resolved, root),
+                                                        pickle.HIGHEST_PROTOCOL))))
+    conn.executemany('INSERT INTO codes VALUES (?, ?)', rows)
+    conn.execute('INSERT INTO info VALUES (?, ?)', ('key', storekey))
+    conn.commit()
+    conn.close()
+    os.rename(tempfile, storepath)
+
+
+def open_actor_store(actorpaths, agentpath):
+    """
+    Opens PETRglobals.ActorStoreName for reading the actor and agent dictionaries in
+    actorpaths and agentpath, first building it -- through read_dictionary_list(), so
+    the dictionary cache is used -- if it is missing or was built from different files.
+    PETRglobals.ActorDict, ActorCodes, AgentDict and the related structures are left
+    empty.
+    """
+    global ActorStorePath
+
+    logger = logging.getLogger('petr_log')
+    storepath = os.path.expanduser(PETRglobals.ActorStoreName)
+    storekey = get_actor_store_key(actorpaths, agentpath)
+    ActorStorePath = ''
+    ActorStoreCache.clear()
+    close_actor_store()
+
+    current = False
+    if os.path.exists(storepath):
+        try:
+            conn = sqlite3.connect(storepath)
+            row = conn.execute("SELECT value FROM info WHERE name = 'key'").fetchone()
+            conn.close()
+            current = row is not None and row[0] == storekey
+        except sqlite3.Error:
+            logger.warning("Could not read actor store " + storepath)
+
+    if not current:
+        print('Building actor store:', storepath)
+        logger.info("Building actor store " + storepath)
+        read_dictionary_list([('actor', actorpath) for actorpath in actorpaths] +
+                             [('agent', agentpath)])
+        storedir = os.path.dirname(storepath)
+        if storedir and not os.path.isdir(storedir):
+            os.makedirs(storedir)
+        write_actor_store(storepath, storekey)
+        for name in DictionaryGlobals['actor'] + DictionaryGlobals['agent']:
+            setattr(PETRglobals, name, type(getattr(PETRglobals, name))())
+
+    ActorStorePath = storepath
+
+
+def get_store_entry(table, key):
+    """
+    Returns the unpickled entry for key in table of the actor store -- key is
+    (kind, word) for phrases and the code index for codes -- or None if there is none.
+    Entries, including the missing ones, are kept in ActorStoreCache, which is limited to
+    PETRglobals.ActorStoreCacheSize entries by dropping the least recently used; they
+    are not kept if this is zero.
+    """
+    global ActorStoreConnection, ActorStorePid
+
+    cachekey = (table, key)
+    if cachekey in ActorStoreCache:
+        entry = ActorStoreCache.pop(cachekey)  # re-inserted as the most recent
+    else:
+        if ActorStorePid != os.getpid():  # connections can't be shared with forked workers
+            ActorStoreConnection = sqlite3.connect(ActorStorePath)
+            ActorStorePid = os.getpid()
+        if table == 'phrases':
+            row = ActorStoreConnection.execute(
+                'SELECT entry FROM phrases WHERE kind = ? AND word = ?', key).fetchone()
+        else:
+            row = ActorStoreConnection.execute(
+                'SELECT entry FROM codes WHERE idx = ?', (key,)).fetchone()
+        if row is None:
+            entry = None
+        else:
+            entry = pickle.loads(bytes(row[0]))
+        if PETRglobals.ActorStoreCacheSize <= 0:  # no cache
+            return entry
+        if len(ActorStoreCache) >= PETRglobals.ActorStoreCacheSize:
+            ActorStoreCache.popitem(last=False)
+    ActorStoreCache[cachekey] = entry
+    return entry
+
+
+def close_actor_store():
+    """
+    Closes the connection to the actor store opened by get_store_entry(), which opens
+    a new one when the store is next read. A connection inherited from the process
+    that forked this one is left to that process.
+    """
+    global ActorStoreConnection, ActorStorePid
+
+    if ActorStoreConnection is not None and ActorStorePid == os.getpid():
+        ActorStoreConnection.close()
+    ActorStoreConnection = None
+    ActorStorePid = 0
+
+
+def reset_dictionaries():
+    """
+    Replaces the dictionary structures in PETRglobals -- see DictionaryGlobals -- with
+    empty ones and closes the actor store, so that the dictionaries can be read again
+    rather than added to the ones already there.
+    """
+    global ActorStorePath
+
+    for kind in DictionaryGlobals:
+        for name in DictionaryGlobals[kind]:
+            setattr(PETRglobals, name, type(getattr(PETRglobals, name))())
+    ActorStorePath = ''
+    ActorStoreCache.clear()
+    close_actor_store()
+
+
+def get_dictionary_set():
+    """
+    Returns the dictionary structures in PETRglobals and the actor store as a dict
+    keyed on name, which set_dictionary_set() restores.
+    """
+    dictset = {'ActorStorePath': ActorStorePath}
+    for kind in DictionaryGlobals:
+        for name in DictionaryGlobals[kind]:
+            dictset[name] = getattr(PETRglobals, name)
+    return dictset
+
+
+def set_dictionary_set(dictset):
+    """ Replaces the dictionaries with dictset, as returned by get_dictionary_set() """
+    global ActorStorePath
+
+    for kind in DictionaryGlobals:
+        for name in DictionaryGlobals[kind]:
+            setattr(PETRglobals, name, dictset[name])
+    ActorStorePath = dictset['ActorStorePath']
+    ActorStoreCache.clear()
+    close_actor_store()  # the store may have been rebuilt, so reconnect
+
+
+# ================== DICTIONARY COMPACTION ================== #
+
+
+def compact_dictionary(kind):
+    """
+    Converts the PETRglobals structures for kind -- see DictionaryGlobals -- to a more
+    compact form once a dictionary file has been read:
+
+    -- word and code strings are interned, so each distinct string is stored once;
+       make_noun_list() already does this for the actor and agent phrases, so the
+       tries built from them need not be walked again
+    -- patterns, code lists and verb entries become tuples, and identical tuples --
+       e.g. the [False, code, primary verb] entries for the forms of a verb, or the
+       code lists of actors with the same codes -- are stored once
+    -- the integer lists of the discard and issue automata become arrays
+
+    Nothing changes these once the file has been read, so this has no effect on the
+    coding; the ActorDict and AgentDict pattern lists themselves remain lists so that
+    further files can be merged into them. This is called by read_dictionary_fragment(),
+    so the snapshots in the dictionary cache are also compact. The empty branches of
+    the compiled tries already share EmptyBranch. show_dictionary_memory() gives the
+    sizes of the structures.
+    """
+    strings = NounWords  # already holds the words of the actor and agent phrases
+    numbers = {}
+    stringtype = type('')
+
+    def compact(seq, shared):
+        # convert seq to a tuple with the strings and integers interned, and with
+        # equal tuples shared
+        items = []
+        for item in seq:
+            itemtype = type(item)
+            if itemtype is stringtype:
+                item = strings.setdefault(item, item)
+            elif itemtype is tuple:
+                item = shared.get(item) or compact(item, shared)
+            elif itemtype is list:
+                item = compact(item, shared)
+            elif itemtype is int:  # not bool: True == 1 but must stay a bool
+                item = numbers.setdefault(item, item)
+            items.append(item)
+        items = tuple(items)
+        return shared.setdefault(items, items)
+
+    def share_tuple(seq, shared):
+        # convert seq to a tuple, with equal tuples shared
+        items = tuple(seq)
+        return shared.setdefault(items, items)
+
+    def intern_keys(branch):
+        if len(branch) == 0:
+            return branch
+        return dict([(strings.setdefault(key, key), child)
+                     for key, child in branch.items()])
+
+    def compact_automaton(automaton):
+        goto, fail, output, lengths = automaton
+        return [[intern_keys(branch) for branch in goto], array.array(str('l'), fail),
+                compact(output, {}), array.array(str('l'), lengths)]
+
+    if kind == 'verb':
+        shared = {}
+        for verb, entry in PETRglobals.VerbDict.items():
+            PETRglobals.VerbDict[verb] = compact(entry, shared)
+        for label, synset in PETRglobals.SynsetDict.items():
+            PETRglobals.SynsetDict[label] = (
+                frozenset([strings.setdefault(word, word) for word in synset[0]]),
+                dict([(word, compact(phrases, shared)) for word, phrases in synset[1].items()]),
+                dict([(word, compact(phrases, shared)) for word, phrases in synset[2].items()]),
+                synset[3])
+        # the index lists only hold pattern numbers, so these are shared as they are
+        # rather than through compact(); they are kept apart from the VerbDict tuples,
+        # which have bools
+        shared = {}
+        for matcher in PETRglobals.VerbMatchers.values():
+            for trie in matcher[:2]:
+                trie[2] = share_tuple(trie[2], shared)
+                stack = [trie[0]]
+                while stack:
+                    node = stack.pop()
+                    node[0] = share_tuple(node[0], shared)
+                    node[1] = share_tuple(node[1], shared)
+                    for kbranch in [2, 3, 4]:
+                        if kbranch < 4:
+                            node[kbranch] = intern_keys(node[kbranch])
+                        stack.extend(node[kbranch].values())
+            matcher[2] = share_tuple([shared.setdefault(pair, pair) for pair in matcher[2]],
+                                     shared)
+
+    elif kind == 'actor' or kind == 'agent':
+        if kind == 'actor':
+            thedict = PETRglobals.ActorDict
+        else:
+            thedict = PETRglobals.AgentDict
+        # the words and (word, connector) pairs of the patterns, and so the words in
+        # the tries, are already shared by make_noun_list()
+        for patlist in thedict.values():
+            patlist[:] = [(strings.setdefault(phlist[0], phlist[0]),) + tuple(phlist[1:])
+                          for phlist in patlist]
+        shared = {}
+        if kind == 'actor':
+            PETRglobals.ActorCodes[:] = [compact(codelist, shared)
+                                         for codelist in PETRglobals.ActorCodes]
+            for kcode, resolved in enumerate(PETRglobals.ActorCodeIndex):
+                if isinstance(resolved, tuple):
+                    PETRglobals.ActorCodeIndex[kcode] = compact(resolved, shared)
+                elif resolved is not None:
+                    PETRglobals.ActorCodeIndex[kcode] = strings.setdefault(resolved, resolved)
+
+    elif kind == 'discard':
+        PETRglobals.DiscardList[:] = [strings.setdefault(target, target)
+                                      for target in PETRglobals.DiscardList]
+        if PETRglobals.DiscardMatcher:
+            PETRglobals.DiscardMatcher = [compact_automaton(PETRglobals.DiscardMatcher[0]),
+                                          compact(PETRglobals.DiscardMatcher[1], {})]
+
+    elif kind == 'issue':
+        shared = {}
+        PETRglobals.IssueList[:] = [compact(issue, shared) for issue in PETRglobals.IssueList]
+        PETRglobals.IssueCodes[:] = [strings.setdefault(code, code)
+                                     for code in PETRglobals.IssueCodes]
+        if PETRglobals.IssueMatcher:
+            PETRglobals.IssueMatcher = [compact_automaton(PETRglobals.IssueMatcher[0]),
+                                        compact(PETRglobals.IssueMatcher[1], shared),
+                                        PETRglobals.IssueMatcher[2]]
+
+    NounWords.clear()
+
+
+def get_object_size(obj, seen):
+    """
+    Returns the memory used by obj and everything it contains, skipping the objects
+    whose id() is in the set seen -- which is updated -- so shared objects are only
+    counted once.
+    """
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
+
+
+def show_dictionary_memory(filename=''):
+# debugging function: displays the memory used by each of the dictionary structures
+# to screen or writes to filename. Objects shared between structures are counted with
+# the first structure that uses them.
+    seen = set()
+    lines = []
+    total = 0
+    for kind in ['verb', 'actor', 'agent', 'discard', 'issue']:
+        for name in DictionaryGlobals[kind]:
+            size = get_object_size(getattr(PETRglobals, name), seen)
+            total += size
+            lines.append('{:<16}{:>10.1f} MB'.format(name, size / 1.0e6))
+    lines.append('{:<16}{:>10.1f} MB'.format('Total', total / 1.0e6))
+    if len(filename) > 0:
+        fout = open(filename, 'w')
+        fout.write('PETRARCH Dictionary Memory\n')
+        fout.write('Run time: ' + PETRglobals.RunTimeString + '\n')
+        for line in lines:
+            fout.write(line + '\n')
+        fout.close()
+    else:
+        for line in lines:
+            print(line)
+
+
 # ==== Input format reading
 
 
@@ -1803,9 +2918,11 @@ def read_pipeline_input(pipeline_list):
                 the format of this dictionary.
     """
     holding = {}
-    for entry in pipeline_list:
+    pipeline_list = list(pipeline_list)  # may be a cursor: the dates are read first
+    dates = utilities._format_datestrs([entry['date'] for entry in pipeline_list])
+    for entry, date in zip(pipeline_list, dates):
         entry_id = str(entry['_id'])
-        meta_content = {'date': utilities._format_datestr(entry['date']),
+        meta_content = {'date': date,
                         'date_added': entry['date_added'],
                         'source': entry['source'],
                         'story_title': entry['title'],
@@ -3,15 +3,26 @@
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import io
 import os
 import sys
+import gc
 import glob
+import re
 import time
+import bisect
 import types
+import collections
 import logging
 import argparse
+import multiprocessing
 import xml.etree.ElementTree as ET
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 ##	petrarch.py
 ##
 # Automated event data coder
@@ -60,18 +71,56 @@ import utilities
 
 ParseList = []   # linearized version of parse tree
 ParseStart = 0   # first element to check (skips (ROOT, initial (S
+ParseMates = []  # offset to the matching (/~ tag of each ParseList element: see index_ParseList()
+ParseKinds = []  # token kind of each ParseList element
+ParseTags = []   # tag class of each ParseList element
+ParseDepth = 0   # count of (XX less count of ~XX in ParseList
+ParseVerbs = []  # locations of the (VP that are followed by a (VB, in order
+
+# token kinds in ParseKinds: the tests 'kind < OpenToken' and 'kind >= OpenToken'
+# distinguish text from markup
+WordToken = 0
+CodeToken = 1   # the code following (NE
+OpenToken = 2   # (XX
+CloseToken = 3  # ~XX
+
+# tag classes in ParseTags, set by get_tag_class(); words and codes are NoTag
+NoTag = 0
+NETag = 1     # NE
+NECTag = 2    # NEC, NECn
+VPTag = 3     # VPn
+VBTag = 4     # VB, VBD, VBN...
+CommaTag = 5  # ,
+OtherTag = 6
+TagClasses = {}  # tag classes by tag, cached by get_tag_class()
 
 # text that can be matched prior to the verb; this is stored in reverse order
 UpperSeq = []
 LowerSeq = []  # text that can be matched following the verb
+# NE records parallel to UpperSeq and LowerSeq: None for anything other than an
+# (NE or (NEC, otherwise (ParseList location, code, compound); see Note-1
+UpperNE = []
+LowerNE = []
 
 SourceLoc = 0  # location of the source within the Upper/LowerSeq
 TargetLoc = 0  # location of the target within the Upper/LowerSeq
 
 SentenceID = ''   # ID line
+SentenceText = ''   # text of the current sentence
+SentenceUpper = ['', '']   # SentenceText and its upper-case version: see get_upper_text()
 EventCode = ''   # event code from the current verb
 SourceCode = ''   # source code from the current verb
 TargetCode = ''   # target code from the current verb
+ActorCodeCache = {}   # date-restricted codes resolved in this run: see get_actor_code()
+ActorCodeDated = False   # set by get_actor_code() when the code had date restrictions
+NEPhraseCache = collections.OrderedDict()   # check_NEphrase() results: see lookup_NEphrase()
+NEPhraseCacheStats = [0, 0]   # hits and misses of NEPhraseCache in this run
+NEPhrases = {}   # (NE phrases not yet coded, by the location of the code: see resolve_NEcode()
+WorkerEvents = {}   # stories shared with the coding workers: see do_coding_parallel()
+CodingWorker = False   # set in the worker processes of do_coding_parallel()
+DictionaryReload = None   # background read of the dictionaries: see reload_dictionaries()
+DictProfile = {}   # dictionary entry counts and times: see count_dictionary_entry()
+ParseFilterCounts = [0, 0]   # sentences checked and filtered by filter_parse_input()
 
 
 # ================================  VALIDATION GLOBALS  ==================== #
@@ -224,21 +273,122 @@ def show_tree_string(sent):
 def check_balance():
     """
     Check the (/~ count in a ParseList and raises UnbalancedTree if it is not
-    balanced.
+    balanced. The count is kept in ParseDepth by index_ParseList().
     """
-    nopen = 0
-    nclose = 0
-    ka = 0
-    while ka < len(ParseList):
-        if ParseList[ka][0] == '(':
-            nopen += 1
-        elif ParseList[ka][0] == '~':
-            nclose += 1
-        ka += 1
-    if nopen != nclose:
+    if ParseDepth != 0:
         raise UnbalancedTree
 
 
+# ========================== PARSELIST INDEX ========================== #
+
+def get_tag_class(tag):
+    """
+    Returns the ParseTags class of tag, which is the tag name without the ( or ~.
+    Classes depend on how the name begins, e.g. VPTag for VP3; a tag such as ((VP3
+    that has parentheses inside it, which only comes from a malformed parse, gets
+    OtherTag.
+    """
+    if tag not in TagClasses:
+        if tag == 'NE':
+            TagClasses[tag] = NETag
+        elif tag.startswith('NE') or 'NEC' in tag:
+            TagClasses[tag] = NECTag
+        elif tag.startswith('VP'):
+            TagClasses[tag] = VPTag
+        elif tag.startswith('VB'):
+            TagClasses[tag] = VBTag
+        elif tag == ',':
+            TagClasses[tag] = CommaTag
+        else:
+            TagClasses[tag] = OtherTag
+    return TagClasses[tag]
+
+
+def index_ParseList():
+    """
+    Sets the lists parallel to ParseList that the coder uses in place of string tests
+    on its elements:
+        ParseKinds: WordToken, CodeToken, OpenToken or CloseToken
+        ParseTags:  tag class from get_tag_class(), NoTag for words and codes
+        ParseMates: offset from each (XX to
+    the ~XX that closes it, and from each ~XX to its (XX, or 0 for words, codes and
+    unmatched tags; also sets ParseDepth. Each ~XX closes the most recent unclosed (XX
+    -- compound expansion can leave tags such as (NNP unclosed inside an (NE -- so
+    ka + ParseMates[ka] + 1 is the end of the phrase beginning at ka. Offsets rather
+    than locations are stored so that deleting a phrase only changes the entries of
+    the phrases enclosing it: see delete_ParseList(). read_TreeBank() sets the index
+    directly; this needs to be called whenever ParseList is changed other than through
+    delete_ParseList().
+
+    ParseVerbs, the locations of the verb phrases that check_verbs() considers, is
+    also set here.
+    """
+    global ParseMates, ParseKinds, ParseTags, ParseDepth, ParseVerbs
+
+    ParseMates = [0] * len(ParseList)
+    ParseKinds = [WordToken] * len(ParseList)
+    ParseTags = [NoTag] * len(ParseList)
+    ParseDepth = 0
+    ParseVerbs = []
+    opentags = {}  # locations of the unclosed (XX, by XX
+    for ka, item in enumerate(ParseList):
+        if item[0] == '(':
+            ParseKinds[ka] = OpenToken
+            ParseTags[ka] = get_tag_class(item[1:])
+            if ParseTags[ka] == NETag and ka + 1 < len(ParseList):
+                ParseKinds[ka + 1] = CodeToken  # reset if this is markup
+            elif (ParseTags[ka] == VBTag and ka > 0 and
+                    ParseKinds[ka - 1] == OpenToken and ParseTags[ka - 1] == VPTag):
+                ParseVerbs.append(ka - 1)
+            if item in opentags:
+                opentags[item].append(ka)
+            else:
+                opentags[item] = [ka]
+            ParseDepth += 1
+        elif item[0] == '~':
+            ParseKinds[ka] = CloseToken
+            ParseTags[ka] = get_tag_class(item[1:])
+            ParseDepth -= 1
+            kopen = opentags.get('(' + item[1:])
+            if kopen:
+                kb = kopen.pop()
+                ParseMates[kb] = ka - kb
+                ParseMates[ka] = kb - ka
+
+
+def delete_ParseList(kstart, kend):
+    """
+    Deletes ParseList[kstart:kend], which should consist of complete phrases, and
+    updates the ParseList index.
+    """
+    global ParseDepth
+
+    ParseDepth -= ParseKinds[kstart:kend].count(OpenToken)
+    ParseDepth += ParseKinds[kstart:kend].count(CloseToken)
+    ndel = kend - kstart
+    # a (VP just before the deletion is re-checked once the deletion is made
+    kvp = bisect.bisect_left(ParseVerbs, kstart - 1)
+    ParseVerbs[kvp:] = [kb - ndel for kb in ParseVerbs[bisect.bisect_left(ParseVerbs, kend):]]
+    ka = kstart - 1
+    while ka >= 0:  # adjust the phrases that enclose the deletion
+        offset = ParseMates[ka]
+        if offset < 0:  # skip a complete phrase
+            ka += offset - 1
+            continue
+        if ka + offset >= kend:
+            ParseMates[ka] -= ndel
+            ParseMates[ka + offset] += ndel
+        ka -= 1
+    del ParseList[kstart:kend]
+    del ParseMates[kstart:kend]
+    del ParseKinds[kstart:kend]
+    del ParseTags[kstart:kend]
+    if (0 < kstart < len(ParseList) and
+            ParseKinds[kstart - 1] == OpenToken and ParseTags[kstart - 1] == VPTag and
+            ParseKinds[kstart] == OpenToken and ParseTags[kstart] == VBTag):
+        ParseVerbs.insert(kvp, kstart - 1)
+
+
 # ========================== VALIDATION FUNCTIONS ========================== #
 
 
@@ -647,7 +797,8 @@ def read_TreeBank():
 
     """
 
-    global ParseList, ParseStart
+    global ParseList, ParseStart, ParseMates, ParseKinds, ParseTags, ParseDepth
+    global ParseVerbs
     global treestr
     global fullline
     global ncindex
@@ -749,11 +900,42 @@ def read_TreeBank():
     #   print 'gNE3',nplist
         return nplist
 
+    def get_bracket_tables():
+        """
+        Returns the bracket tables of treestr, which are computed in a single stack-based
+        pass and recomputed only when treestr has been modified:
+            close[ka]   : location following the ')' that closes the '(' at ka
+            enclose[ka] : location of the '(' of the phrase that encloses ka
+        Both are -1 when there is no such location. The tables are empty if treestr has
+        a ')' that closes nothing, in which case the bounds are found by scanning.
+        """
+        global treestr
+        if brackets['tree'] is not treestr:
+            close = [-1] * len(treestr)
+            enclose = [-1] * len(treestr)
+            opstack = [-1]
+            for ka, char in enumerate(treestr):
+                enclose[ka] = opstack[-1]
+                if char == '(':
+                    opstack.append(ka)
+                elif char == ')':
+                    if len(opstack) == 1:
+                        close = enclose = []
+                        break
+                    close[opstack.pop()] = ka + 1
+            brackets['tree'] = treestr
+            brackets['close'] = close
+            brackets['enclose'] = enclose
+        return brackets['close'], brackets['enclose']
+
     def get_forward_bounds(ka):
         """
         Returns the bounds of a phrase in treestr that begins at ka, including the final space.
         """
         global treestr  # <13.12.07> see note above
+        close = get_bracket_tables()[0]
+        if 0 <= ka < len(close) and close[ka] >= 0:
+            return [ka, close[ka]]
         kb = ka + 1
         nparen = 1  # paren count
         while nparen > 0:
@@ -772,6 +954,9 @@ def read_TreeBank():
         Returns the bounds of a phrase in treestr that encloses the phrase beginning at ka
         """
         global treestr  # <13.12.07> see note above
+        enclose = get_bracket_tables()[1]
+        if 0 <= ka < len(enclose) and enclose[ka] >= 0:
+            return [enclose[ka], get_forward_bounds(enclose[ka])[1]]
         kstart = ka - 1
         nparen = 0  # paren count
         while nparen <= 0:  # back out to the phrase tag that encloses this
@@ -894,12 +1079,12 @@ def read_TreeBank():
                 if ShowMarkCompd:
                     print('rc/RTB-2: NE:', nplist)
                 for kb in range(len(nplist)):
-                    fullline += nplist[kb] + ' '
+                    fullline.append(nplist[kb] + ' ')
                 ka = npbds[1]
             ka += 1
-        fullline += ' ) '  # closes the nec
+        fullline.append(' ) ')  # closes the nec
         if ShowMarkCompd:
-            print('rc/RTB3: NE:', fullline)
+            print('rc/RTB3: NE:', ''.join(fullline))
         return necbds[1] + 1
 
     def reduce_SBAR(kstart):
@@ -1008,7 +1193,8 @@ def read_TreeBank():
         	treestr = treestr.replace('~','-TILDA-')
 
     logger = logging.getLogger('petr_log')
-    fullline = ''
+    fullline = []  # pieces of the marked-up tree, joined when it is complete
+    brackets = {'tree': None}  # see get_bracket_tables()
     vpindex = 1
     npindex = 1
     ncindex = 1
@@ -1044,7 +1230,7 @@ def read_TreeBank():
             nephrase = ''
             if ShowNEParsing:
                 print('BBD: ', treestr[npbds[0]:npbds[1]])
-            if '(POS' in treestr[ka + 3:npbds[1]]:  # get the (NP possessive
+            if treestr.find('(POS', ka + 3, npbds[1]) >= 0:  # get the (NP possessive
                 kb = treestr.find('(POS', ka + 4)
                 nephrase = treestr[ka + 4:kb - 1]  # get string prior to (POS
 #				print '++:',treestr[kb:]
@@ -1058,7 +1244,7 @@ def read_TreeBank():
                 if ShowNEParsing:
                     print('RTPOS: NE:', nephrase)
 
-            elif '(PP' in treestr[ka + 3:npbds[1]]:  # prepositional phrase
+            elif treestr.find('(PP', ka + 3, npbds[1]) >= 0:  # prepositional phrase
                 if False:
 #				if True:
                     print('PPP-1: ', treestr[ka:npbds[1]])
@@ -1070,7 +1256,7 @@ def read_TreeBank():
                     print('RTPREP: NE:', nephrase)
 
             # no further (NPs, so convert to NE
-            elif '(NP' not in treestr[ka + 3:npbds[1]] and '(NEC' not in treestr[ka + 3:npbds[1]]:
+            elif treestr.find('(NP', ka + 3, npbds[1]) < 0 and treestr.find('(NEC', ka + 3, npbds[1]) < 0:
                 nephrase = treestr[ka:npbds[1]]
                 if ShowNEParsing:
                     print('RTNP: NE:', nephrase)
@@ -1085,50 +1271,82 @@ def read_TreeBank():
                     # <14.02.27> Seems like an odd place to hit this error, and it will probably go away...
 			        check_irregulars('empty_nplist')
                 for kb in range(len(nplist)):
-                    fullline += nplist[kb] + ' '
+                    fullline.append(nplist[kb] + ' ')
                 ka = npbds[1] + 1
             else:  # it's something else...
-                fullline += '(NP' + str(npindex) + ' '  # add index
+                fullline.append('(NP' + str(npindex) + ' ')  # add index
                 npindex += 1
                 ka += 4
 
         elif treestr.startswith('(NEC ', ka):
-            fullline += '(NEC' + str(ncindex) + ' '
+            fullline.append('(NEC' + str(ncindex) + ' ')
             ncindex += 1
             ka = resolve_compounds(ka)
 
         elif treestr.startswith('(VP ', ka):  # assign index to VP
-            fullline += '(VP' + str(vpindex) + ' '
+            fullline.append('(VP' + str(vpindex) + ' ')
             vpindex += 1
             ka += 4
-        else:
-            fullline += treestr[ka]
-            ka += 1
+        else:  # copy through to the next phrase
+            kb = treestr.find('(', ka + 1)
+            if kb < 0:
+                kb = len(treestr)
+            fullline.append(treestr[ka:kb])
+            ka = kb
 
     # convert the text to ParseList format; convert ')' to ~XX tags
-    ParseList = fullline.split()
+    ParseList = ''.join(fullline).split()
 #	print '<<',ParseList
-    kopen = 0
-    kclose = 0
-    for item in ParseList:
-        if item.startswith('('):
-            kopen += 1
-        elif item == ')':
-            kclose += 1
-#		else: print item
     if ShowRTTrees:
+        kopen = 0
+        kclose = 0
+        for item in ParseList:
+            if item.startswith('('):
+                kopen += 1
+            elif item == ')':
+                kclose += 1
+#		    else: print item
         print('RT2 count:', kopen, kclose)
+    # the ParseList index is set here rather than by index_ParseList() since the
+    # tags are matched anyway
+    ParseMates = [0] * len(ParseList)
+    ParseKinds = [WordToken] * len(ParseList)
+    ParseTags = [NoTag] * len(ParseList)
+    ParseVerbs = []
     ka = 0
     opstack = []
     while ka < len(ParseList):
         if ParseList[ka][0] == '(':
-            opstack.append(ParseList[ka][1:])
+            opstack.append(ka)
+            ParseKinds[ka] = OpenToken
+            ParseTags[ka] = get_tag_class(ParseList[ka][1:])
+            if ParseTags[ka] == NETag and ka + 1 < len(ParseList):
+                ParseKinds[ka + 1] = CodeToken  # reset if this is markup
+            elif (ParseTags[ka] == VBTag and ka > 0 and
+                    ParseKinds[ka - 1] == OpenToken and ParseTags[ka - 1] == VPTag):
+                ParseVerbs.append(ka - 1)
         if ParseList[ka][0] == ')':
             if len(opstack) == 0:
                 break
-            op = opstack.pop()
-#			print '<<',op
-            ParseList[ka] = '~' + op
+            kb = opstack.pop()
+#			print '<<',ParseList[kb]
+            ParseList[ka] = '~' + ParseList[kb][1:]
+            ParseMates[kb] = ka - kb
+            ParseMates[ka] = kb - ka
+            ParseKinds[ka] = CloseToken
+            ParseTags[ka] = ParseTags[kb]
+        ka += 1
+    ParseDepth = len(opstack)
+    while ka < len(ParseList):  # unmatched remainder
+        if ParseList[ka][0] == '(':
+            ParseKinds[ka] = OpenToken
+            ParseTags[ka] = get_tag_class(ParseList[ka][1:])
+            ParseDepth += 1
+            if (ParseTags[ka] == VBTag and
+                    ParseKinds[ka - 1] == OpenToken and ParseTags[ka - 1] == VPTag):
+                ParseVerbs.append(ka - 1)
+        elif ParseKinds[ka] == CodeToken:  # only the ) that stopped the matching
+            ParseKinds[ka] = WordToken
         ka += 1
 
     if ShowRTTrees:
@@ -1161,7 +1379,7 @@ def get_loccodes(thisloc):
     small number of words. These phrases can then be processed with named-entity-resolution
     software to extend the dictionaries.
     """
-    global UpperSeq, LowerSeq, codelist, StoryEventList
+    global UpperSeq, LowerSeq, UpperNE, LowerNE, codelist, StoryEventList
 
     StoryEventList = []
 
@@ -1190,15 +1408,18 @@ def get_loccodes(thisloc):
         If PETRglobals.WriteActorText is True, root phrase is added to the code following the
         string PETRglobals.TextPrimer
         """
-        global UpperSeq, LowerSeq, codelist
-
-
+        global UpperSeq, LowerSeq, UpperNE, LowerNE, codelist
 
         if isupperseq:
             acneitem = UpperSeq[neloc] # "add_code neitem"; nothing to do with acne...
+            acnerec = UpperNE[neloc]
         else:
             acneitem = LowerSeq[neloc]
-        accode = acneitem[acneitem.find('>') + 1:]
+            acnerec = LowerNE[neloc]
+        if acnerec and not acnerec[2]:
+            accode = get_NEcode(acnerec)
+        else:
+            accode = acneitem  # compounds are not expanded here
 #        print('AC-1:',neloc, acneitem, accode, codelist)
         if accode != '---':
             codelist.append(accode)
@@ -1222,17 +1443,16 @@ def get_loccodes(thisloc):
 #    print ('   LSeq:',LowerSeq)
     if thisloc[1]:
         try:
-            neitem = UpperSeq[thisloc[0]]
+            nerecord = UpperNE[thisloc[0]]
         except IndexError:
             raise_ParseList_error('Initial index error on UpperSeq in get_loccodes()')
 
-#        print ('GLC1',neitem)
         # extract the compound codes from the (NEC ... ~NEC sequence
-        if '(NEC' in neitem:
+        if nerecord and nerecord[2]:
             ka = thisloc[0] - 1  # UpperSeq is stored in reverse order
             while '~NEC' not in UpperSeq[ka]:
 #                print('GLC2',ka, UpperSeq[ka])
-                if '(NE' in UpperSeq[ka]:
+                if UpperNE[ka]:
                     add_code(ka, True)
                 ka -= 1
                 if ka < 0:
@@ -1241,19 +1461,18 @@ def get_loccodes(thisloc):
             add_code(thisloc[0], True)  # simple code
     else:
         try:
-            neitem = LowerSeq[thisloc[0]]
+            nerecord = LowerNE[thisloc[0]]
         except IndexError:
             raise_ParseList_error('Initial index error on LowerSeq in get_loccodes()')
-#        print ('GLC3',neitem)
         StoryEventList.append([SentenceID])
         for event in CodedEvents:
             StoryEventList.append(event)
             print(SentenceID + '\t' + event[0] + '\t' + event[1] + '\t' + event[2])
-        if '(NEC' in neitem:  # extract the compound codes
+        if nerecord and nerecord[2]:  # extract the compound codes
             ka = thisloc[0] + 1
             while '~NEC' not in LowerSeq[ka]:
 #                print('GLC4',ka, LowerSeq[ka])
-                if '(NE' in LowerSeq[ka]:
+                if LowerNE[ka]:
                     add_code(ka, False)
                 ka += 1
                 if ka >= len(LowerSeq):
@@ -1274,22 +1493,20 @@ def find_source():
     Also note that this matches either (NE and (NEC: these are processed
     differently in make_event_string()
     """
-    global UpperSeq, SourceLoc
+    global UpperNE, SourceLoc
 #	print "FS-1"
-    kseq = len(UpperSeq) - 1
+    kseq = len(UpperNE) - 1
     while kseq >= 0:
-        if ('(NEC' in UpperSeq[kseq]):
-            SourceLoc = [kseq, True]
-            return
-        if ('(NE' in UpperSeq[kseq]) and ('>---' not in UpperSeq[kseq]):
+        nerec = UpperNE[kseq]
+        if nerec and (nerec[2] or not get_NEcode(nerec).startswith('---')):
             SourceLoc = [kseq, True]
             return
         kseq -= 1
                                                         # failed, so check for
                                                         # uncoded source
-    kseq = len(UpperSeq) - 1
+    kseq = len(UpperNE) - 1
     while kseq >= 0:
-        if ('(NE' in UpperSeq[kseq]):
+        if UpperNE[kseq]:
             SourceLoc = [kseq, True]
             return
         kseq -= 1
@@ -1309,28 +1526,39 @@ def find_target():
         4. first null-coded (NE in UpperSeq
     """
 
-    global UpperSeq, LowerSeq, SourceLoc, TargetLoc
+    global UpperNE, LowerNE, SourceLoc, TargetLoc
+
+    def is_candidate(nerec):
+        """
+        True if nerec is a compound or is coded with something other than the
+        source code; a code is treated as the source code if it begins with it.
+        """
+        if nerec[2] or srccode is None:
+            return nerec[2] or not get_NEcode(nerec).startswith('---')
+        code = get_NEcode(nerec)
+        return not (code.startswith('---') or code.startswith(srccode))
+
     srccodelist = get_loccodes(SourceLoc)
     if len(srccodelist) == 1:
-        srccode = '>' + srccodelist[0]
+        srccode = srccodelist[0]
     else:
-        srccode = '>>>>'  # placeholder for a compound; this will not occur
+        srccode = None  # compound: every coded (NE is a candidate
 #	print('FT-1: srccode',srccode)
 #	print UpperSeq, LowerSeq
     kseq = 0
-    while kseq < len(LowerSeq):
-        if ('(NE' in LowerSeq[kseq]) and ('>---' not in LowerSeq[kseq]):
-            if (srccode not in LowerSeq[kseq]):
-                TargetLoc = [kseq, False]
-                return
+    while kseq < len(LowerNE):
+        if LowerNE[kseq] and is_candidate(LowerNE[kseq]):
+            TargetLoc = [kseq, False]
+            return
         kseq += 1
                                                         # failed, so check for
                                                         # uncoded target in
                                                         # LowerSeq
     kseq = 0
-    while kseq < len(LowerSeq):
+    while kseq < len(LowerNE):
         # source might also be uncoded now
-        if ('(NE' in LowerSeq[kseq]) and ('>---' in LowerSeq[kseq]):
+        nerec = LowerNE[kseq]
+        if nerec and not nerec[2] and get_NEcode(nerec).startswith('---'):
             TargetLoc = [kseq, False]
             return
         kseq += 1
@@ -1338,18 +1566,18 @@ def find_target():
     # still didn't work, so look in UpperSeq going away from the verb, so we
     # increment through UpperSeq
     kseq = 0
-    while kseq < len(UpperSeq):
-        if ('(NE' in UpperSeq[kseq]) and ('>---' not in UpperSeq[kseq]):
-            if (srccode not in UpperSeq[kseq]):
-                TargetLoc = [kseq, True]
-                return
+    while kseq < len(UpperNE):
+        if UpperNE[kseq] and is_candidate(UpperNE[kseq]):
+            TargetLoc = [kseq, True]
+            return
         kseq += 1
                                                         # that failed as well,
                                                         # so finally check for
                                                         # uncoded target
     kseq = 0
-    while kseq < len(UpperSeq):
-        if ('(NE' in UpperSeq[kseq]) and ('>---' in UpperSeq[kseq]):
+    while kseq < len(UpperNE):
+        nerec = UpperNE[kseq]
+        if nerec and not nerec[2] and get_NEcode(nerec).startswith('---'):
             # needs to be a different (NE from source
             if (kseq != SourceLoc[0]):
                 TargetLoc = [kseq, True]
@@ -1363,28 +1591,36 @@ def get_upper_seq(kword):
     terminated by ParseStart, ~S or ~,
     """
     global ParseList, ParseStart
-    global UpperSeq
+    global UpperSeq, UpperNE
 
     UpperSeq = []
+    UpperNE = []
     while kword >= ParseStart:
 #        print('%%%',kword,ParseList[kword])
 #       if ('~S' in ParseList[kword]) or ('~,' in ParseList[kword]): break
-        if ('~,' in ParseList[kword]): break
-        if ('(NE' == ParseList[kword]):
+        kind = ParseKinds[kword]
+        if kind == CloseToken and ParseTags[kword] == CommaTag: break
+        if kind == OpenToken and ParseTags[kword] == NETag:
             code = UpperSeq.pop()  # remove the code
-            UpperSeq.append(ParseList[kword]+'<'+str(kword)+'>'+code)  # <pas 13.07.26> See Note-1
-        elif ('NEC' in ParseList[kword]):
             UpperSeq.append(ParseList[kword])
-        elif ('~NE' in ParseList[kword]):
+            if kword + 1 in NEPhrases:
+                code = None  # not coded yet
+            UpperNE[-1] = (kword, code, False)  # <pas 13.07.26> See Note-1
+        elif ParseTags[kword] == NECTag:
             UpperSeq.append(ParseList[kword])
-        elif (ParseList[kword][0] != '(') and (ParseList[kword][0] != '~'):
+            UpperNE.append((kword, None, True) if kind == OpenToken else None)
+        elif kind == CloseToken and ParseTags[kword] == NETag:
             UpperSeq.append(ParseList[kword])
+            UpperNE.append(None)
+        elif kind < OpenToken:
+            UpperSeq.append(ParseList[kword])
+            UpperNE.append(None)
         kword -= 1
         if kword < 0:
             raise_ParseList_error('Bounds underflow in get_upper_seq()') # error is handled in check_verbs
             return  # not needed, right?
 
-    if ShowCodingSeq: print("Upper sequence:",UpperSeq)
+    if ShowCodingSeq: print("Upper sequence:",UpperSeq,UpperNE)
 
 def get_lower_seq(kword, endtag):
     """
@@ -1392,26 +1628,35 @@ def get_lower_seq(kword, endtag):
     words in the VP
     """
     global ParseList
-    global LowerSeq
+    global LowerSeq, LowerNE
 
     LowerSeq = []
+    LowerNE = []
     while (endtag not in ParseList[kword]):  # limit this to the verb phrase itself
 #       print "MCS-2",kword, ParseList[kword]
-        if ('(NE' == ParseList[kword]):
-            LowerSeq.append(ParseList[kword]+'<'+str(kword)+'>'+ParseList[kword+1])  # <pas 13.07.26> See Note-1
+        kind = ParseKinds[kword]
+        if kind == OpenToken and ParseTags[kword] == NETag:
+            LowerSeq.append(ParseList[kword])
+            if kword + 1 in NEPhrases:
+                LowerNE.append((kword, None, False))  # not coded yet
+            else:
+                LowerNE.append((kword, ParseList[kword + 1], False))  # <pas 13.07.26> See Note-1
             kword += 1  # skip code
-        elif ('NEC' in ParseList[kword]):
+        elif ParseTags[kword] == NECTag:
             LowerSeq.append(ParseList[kword])
-        elif ('~NE' in ParseList[kword]):
+            LowerNE.append((kword, None, True) if kind == OpenToken else None)
+        elif kind == CloseToken and ParseTags[kword] == NETag:
             LowerSeq.append(ParseList[kword])
-        elif (ParseList[kword][0] != '(') and (ParseList[kword][0] != '~'):
+            LowerNE.append(None)
+        elif kind < OpenToken:
             LowerSeq.append(ParseList[kword])
+            LowerNE.append(None)
         kword += 1
         if kword >= len(ParseList):  # <14.04.23>: need to just set this to len(ParseList)?
             raise_ParseList_error('Bounds overflow in get_lower_seq()') # error is handled in check_verbs
             return  # not needed, right?
 
-    if ShowCodingSeq: print("Lower sequence:",LowerSeq)
+    if ShowCodingSeq: print("Lower sequence:",LowerSeq,LowerNE)
 
 def make_check_sequences(verbloc, endtag):
     """
@@ -1428,6 +1673,12 @@ def make_check_sequences(verbloc, endtag):
     matched, but that could be wrong.
     Hmmm, do we really need the location, or just the code? Getting the code is cheap
 
+    The location and code are now kept as records in UpperNE/LowerNE, which run
+    parallel to the *Seq lists: these hold None except at an (NE, where the record is
+    (location, code, False), or an (NEC, where it is (location, None, True). The *Seq
+    lists keep the bare tag text, so the pattern matching still only sees strings and
+    find_source(), find_target() and get_loccodes() never need to decode them.
+
     <14.06.14>: get_uppper_seq and get_lower_seq were split out when make_multi_sequences()
     was created, so this can probably now be made into in-line code and removed as a
     function.
@@ -1452,7 +1703,9 @@ def make_multi_sequences(multilist, verbloc, endtag):
     if multilist[0]:  # words follow the verb
         kword = verbloc + 1
         while ka < len(multilist):
-            if  (ParseList[kword][0] != '(') and (ParseList[kword][0] != '~'):
+            if ParseKinds[kword] < OpenToken:
+                if kword in NEPhrases:  # codes are compared as well
+                    resolve_NEcode(kword)
                 if ParseList[kword] == multilist[ka]:
                     ka += 1
                 else:
@@ -1466,7 +1719,9 @@ def make_multi_sequences(multilist, verbloc, endtag):
         kword = verbloc - 1
         while ka < len(multilist):
 #            print('@@@',kword,ParseList[kword])
-            if  (ParseList[kword][0] != '(') and (ParseList[kword][0] != '~'):
+            if ParseKinds[kword] < OpenToken:
+                if kword in NEPhrases:  # codes are compared as well
+                    resolve_NEcode(kword)
                 if ParseList[kword] == multilist[ka]:
                     ka += 1
                 else:
@@ -1513,51 +1768,11 @@ def verb_pattern_match(patlist, aseq, isupperseq):
 
     def syn_match(isupperseq):
         global kseq, kpatword
-#		print "&targ:",patlist[kpatword]
-        if patlist[kpatword] in PETRglobals.VerbDict:
-            # first try the single word cases
-            if aseq[kseq] not in PETRglobals.VerbDict[patlist[kpatword]]:
-                for words in PETRglobals.VerbDict[patlist[kpatword]]:
-#					print '&&:',words
-                    """
-                    #11,914 additions and 298 deletions
-                        if words[0] == '&':
-                            if syn_match(isupperseq):
-                                    if last_patword(): return True
-                                    if last_seqword(): return False
-                            else: return False
-                    elif ' ' in words: # try to match a phrase """
-                    if ' ' in words:  # try to match a phrase
-                        # <14.05.08> may want to pre-split this and store as a
-                        # list
-                        wordlist = words.split()
-#						print '>>:',wordlist, aseq
-                        # need to go through phrase in reverse in upperseq
-                        if isupperseq:
-                            ka = len(wordlist) - 1
-                            offset = 0
-                            while (ka >= 0) and ((kseq + offset) < len(aseq)) and (aseq[kseq + offset] == wordlist[ka]):
-                                ka -= 1   # will this handle reverse matches?
-                                offset += 1
-                            if ka < 0:
-                                ka = len(wordlist)  # triggers match below
-                        else:
-                            ka = 0
-                            while (ka < len(wordlist)) and ((kseq + ka) < len(aseq)) and (aseq[kseq + ka] == wordlist[ka]):
-                                ka += 1
-                        if ka == len(wordlist):
-                            # last_seq() will also increment
-                            kseq += len(wordlist) - 1
-#                            print(words,"matches", kseq)
-                            return True
-                return False
-            else:
-#                print( "&Match:",aseq[kseq])
-                return True
-        else:
-            # throw an error here, but actually should trap these in
-            # read_verb_dict so the check won't be needed
-            print("&Error:", patlist[kpatword], "not in dictionary")
+        ka = match_synset(patlist[kpatword], aseq, kseq, isupperseq)
+        if ka is None:
+            return False
+        kseq = ka  # last_seq() will also increment
+        return True
 
     def last_seqword():
         global kseq
@@ -1707,6 +1922,245 @@ def verb_pattern_match(patlist, aseq, isupperseq):
     )
 
 
+def match_synset(synset, aseq, kseq, isupperseq):
+    """
+    Checks whether a word or phrase in synset matches aseq at kseq, using the index in
+    PETRglobals.SynsetDict. Returns the location of the last word of the match, or None
+    if there is no match. Single words are tried first, then phrases in the order of
+    the synset; phrases are reversed in the upper sequence.
+    """
+    if synset not in PETRglobals.SynsetDict:
+        # throw an error here, but actually should trap these in
+        # read_verb_dict so the check won't be needed
+        print("&Error:", synset, "not in dictionary")
+        return None
+    words, phrases, upperphrases, openmatch = PETRglobals.SynsetDict[synset]
+    if aseq[kseq] in words:
+        return kseq
+    if isupperseq:
+        phrases = upperphrases
+    if aseq[kseq] in phrases:
+        for phrase in phrases[aseq[kseq]]:
+            if tuple(aseq[kseq:kseq + len(phrase)]) == phrase:
+                return kseq + len(phrase) - 1
+    if openmatch:
+        return kseq - 1
+    return None
+
+
+def match_verb_trie(trie, aseq, isupperseq):
+    """
+    Evaluates all of the patterns in a trie made by PETRreader.make_verb_pattern_trie()
+    against aseq, walking the words shared by the patterns only once. Returns a list,
+    indexed like the trie, of
+
+            (status, sourceloc, targetloc, error)
+
+    where status is what verb_pattern_match() returns for the pattern, sourceloc and
+    targetloc are the values it would leave in SourceLoc and TargetLoc -- None if it
+    does not set them -- and error is the string it would pass to
+    raise_ParseList_error(), or '' if none. The error is not raised here: the caller
+    does this if the pattern is actually reached.
+    """
+    root, npatterns, emptyindex = trie
+    results = [None] * npatterns
+    lastseq = len(aseq) - 1
+
+    def set_results(indices, status, sourceloc, targetloc, error=''):
+        result = (status, sourceloc, targetloc, error)
+        for kpat in indices:
+            results[kpat] = result
+
+    def find_ne(kseq):
+        # return the location of the (NE element in aseq starting from kseq, which
+        # is inside an NE, or -1 if there isn't one
+        ka = kseq
+        while '(NE' not in aseq[ka]:
+            if isupperseq:
+                ka += 1
+                if ka > lastseq:
+                    return -1
+            else:
+                ka -= 1
+                if ka < 0:
+                    return -1
+        return ka
+
+    def match_token(connector, word, kseq, insideNE, inNEC, sourceloc, targetloc):
+        # match a token or synset; returns the state after the match with kseq = None
+        # on failure, followed by the error string
+        while True:
+            if ('~NE' in aseq[kseq]) or ('(NE' in aseq[kseq]):
+                if kseq == lastseq:
+                    return (None, insideNE, inNEC, sourceloc, targetloc, '')
+                if len(aseq[kseq]) > 3 and aseq[kseq][3] == 'C':
+                    inNEC = not inNEC
+                else:
+                    insideNE = not insideNE
+                kseq += 1
+                continue
+
+            if len(word) == 1:
+                if insideNE or inNEC:
+                    if insideNE:
+                        if word == '$' or word == '+':
+                            ka = find_ne(kseq)
+                            if ka < 0:
+                                if isupperseq:
+                                    return (None, insideNE, inNEC, sourceloc, targetloc,
+                                            'Overflow error in find_ne(kseq) in verb_pattern_match()')
+                                else:
+                                    return (None, insideNE, inNEC, sourceloc, targetloc,
+                                            'Underflow error in find_ne(kseq) in verb_pattern_match()')
+                            if word == '$':
+                                sourceloc = [ka, isupperseq]
+                            else:
+                                targetloc = [ka, isupperseq]
+                        elif word == '^':  # skip to the end of the (NE
+                            while '~NE' not in aseq[kseq]:
+                                if isupperseq:
+                                    kseq -= 1
+                                else:
+                                    kseq += 1
+                                if kseq < 0 or kseq > lastseq:
+                                    return (None, insideNE, inNEC, sourceloc, targetloc,
+                                            "find_ne(kseq) in skip assessment, verb_pattern_match()")
+                            insideNE = isupperseq
+
+                    elif word == '%':  # deal with compound
+                        ka = kseq
+                        while '(NEC' not in aseq[ka]:
+                            if isupperseq: ka += 1
+                            else: ka -= 1
+                            if ka < 0 or ka > lastseq:
+                                return (None, insideNE, inNEC, sourceloc, targetloc, '')
+                        sourceloc = [ka, isupperseq]
+                        targetloc = [ka, isupperseq]
+                    return (kseq, insideNE, inNEC, sourceloc, targetloc, '')
+
+            elif word[0] == '&':  # match a synset
+                ka = match_synset(word, aseq, kseq, isupperseq)
+                if ka is not None:
+                    return (ka, insideNE, inNEC, sourceloc, targetloc, '')
+
+            if connector != ' ' or kseq == lastseq:
+                return (None, insideNE, inNEC, sourceloc, targetloc, '')
+            kseq += 1
+
+    def matched(node, kseq, insideNE, inNEC, sourceloc, targetloc):
+        # the word leading to node matched at kseq: patterns ending at node succeed,
+        # the rest continue from the next word in aseq
+        if kseq >= lastseq:
+            set_results(node[0], False, sourceloc, targetloc)  # hit end of sequence
+        elif len(node[1]) < len(node[0]):
+            search(node, kseq + 1, insideNE, inNEC, sourceloc, targetloc)
+        set_results(node[1], True, sourceloc, targetloc)
+
+    def search(node, kseq, insideNE, inNEC, sourceloc, targetloc):
+        # match the words following node starting at kseq
+        for (connector, word), child in node[4].items():
+            if len(word) == 0:  # nothing to see here, move along
+                set_results(child[1], False, sourceloc, targetloc)
+                if len(child[1]) < len(child[0]):
+                    search(child, kseq, insideNE, inNEC, sourceloc, targetloc)
+                continue
+            state = match_token(connector, word, kseq, insideNE, inNEC, sourceloc, targetloc)
+            if state[-1]:
+                set_results(child[0], False, None, None, state[-1])
+            elif state[0] is None:
+                set_results(child[0], False, state[3], state[4])
+            else:
+                matched(child, *state[:-1])
+
+        if node[2] or node[3]:
+            # single pass through aseq: the consecutive words can only match at the
+            # first word and the others match at their first occurrence
+            found = {}
+            firstword = None
+            ka = kseq
+            while True:
+                if ('~NE' in aseq[ka]) or ('(NE' in aseq[ka]):
+                    if ka == lastseq:
+                        break
+                    if len(aseq[ka]) > 3 and aseq[ka][3] == 'C':
+                        inNEC = not inNEC
+                    else:
+                        insideNE = not insideNE
+                else:
+                    if firstword is None:
+                        firstword = (aseq[ka], ka, insideNE, inNEC)
+                        if not node[2]:
+                            break
+                    if aseq[ka] in node[2] and aseq[ka] not in found:
+                        found[aseq[ka]] = (ka, insideNE, inNEC)
+                        if len(found) == len(node[2]):
+                            break
+                    if ka == lastseq:
+                        break
+                ka += 1
+
+            for word, child in node[3].items():
+                if firstword is not None and word == firstword[0]:
+                    matched(child, firstword[1], firstword[2], firstword[3],
+                            sourceloc, targetloc)
+                else:
+                    set_results(child[0], False, sourceloc, targetloc)
+            for word, child in node[2].items():
+                if word in found:
+                    matched(child, found[word][0], found[word][1], found[word][2],
+                            sourceloc, targetloc)
+                else:
+                    set_results(child[0], False, sourceloc, targetloc)
+
+    set_results(emptyindex, True, None, None)  # nothing to evaluate, so okay
+    if len(aseq) == 0:
+        set_results(root[0], False, None, None)  # nothing to match, so fails
+    else:
+        set_results(root[1], True, None, None)
+        search(root, 0, False, False, None, None)
+    return results
+
+
+def match_verb_patterns(matcher):
+    """
+    Checks the patterns compiled into matcher -- an entry in PETRglobals.VerbMatchers --
+    against UpperSeq and LowerSeq. Returns the index in the VerbDict pattern list of the
+    first entry where both patterns match, or 0 if there is no match, and leaves
+    SourceLoc and TargetLoc as they would be after the verb_pattern_match() loop in
+    check_verbs().
+    """
+    global SourceLoc, TargetLoc
+
+    uppertrie, lowertrie, entries = matcher
+    upper = match_verb_trie(uppertrie, UpperSeq, True)
+    lower = None
+    kpat = 0
+    while kpat < len(entries):
+        SourceLoc = [-1, True]
+        TargetLoc = [-1, True]
+        status, sourceloc, targetloc, error = upper[entries[kpat][0]]
+        if error:
+            raise_ParseList_error(error)
+        if sourceloc:
+            SourceLoc = list(sourceloc)
+        if targetloc:
+            TargetLoc = list(targetloc)
+        if status:
+            if lower is None:
+                lower = match_verb_trie(lowertrie, LowerSeq, False)
+            status, sourceloc, targetloc, error = lower[entries[kpat][1]]
+            if error:
+                raise_ParseList_error(error)
+            if sourceloc:
+                SourceLoc = list(sourceloc)
+            if targetloc:
+                TargetLoc = list(targetloc)
+            if status:
+                return kpat + 2
+        kpat += 1
+    return 0
+
+
 def check_verbs():
     """
     Primary coding loop which looks for verbs, checks whether any of their
@@ -1721,6 +2175,11 @@ def check_verbs():
 
     [0]: the location in *Seq where the NE begins
     [1]: True - located in UpperSeq, otherwise in LowerSeq
+
+    Only the verb phrases in ParseVerbs whose verb is in the dictionary are
+    visited: see get_verb_candidates(). After a match the scan resumes past the
+    first element containing the ~VP tag of the phrase, as the other walkers of
+    ParseList do.
     """
     global EventCode, SourceLoc, TargetLoc
     global IsPassive
@@ -1745,10 +2204,9 @@ def check_verbs():
         Check whether the verb phrase beginning at kitem is passive; returns
         location of verb if true, zero otherwise.
         """
-        try:
-            cpendtag = ParseList.index('~' + ParseList[kitem][1:])
-        except ValueError:
+        if ParseMates[kitem] <= 0:
             raise_CheckVerbs_error(kitem, "check_passive()")
+        cpendtag = kitem + ParseMates[kitem]
 #		print "CV/CP:",ParseList[kitem:cpendtag]
         # no point in looking before + 3 since we need an auxiliary verb
         if '(VBN' in ParseList[kitem + 3:cpendtag]:
@@ -1758,7 +2216,7 @@ def check_verbs():
             else:  # check for the auxiliary verb
                 ka = ppvloc - 3
                 while ka > kitem:
-                    if '~VB' in ParseList[ka]:
+                    if ParseKinds[ka] == CloseToken and ParseTags[ka] == VBTag:
                         if ParseList[ka - 1] in ['WAS', 'IS', 'BEEN', 'WAS']:
                             return (
                                 # <14.04.30> replace this with a synset? Or a
@@ -1770,87 +2228,137 @@ def check_verbs():
         else:
             return 0
 
-    kitem = ParseStart
-    while kitem < len(ParseList):
-        if ('(VP' in ParseList[kitem]) and ('(VB' in ParseList[kitem + 1]):
-            vpstart = kitem   # check_passive could change this
+    def get_verb_candidates():
+        """
+        Finds the verb phrases in ParseVerbs whose verb -- the passive verb if
+        check_passive() finds one -- is in VerbDict, and returns three lists
+        parallel to ParseVerbs:
+            verblocs:  location of the verb, or 0 if the phrase is not coded
+            passives:  True if the verb is passive
+            nextverbs: index of the first coded phrase that the scan reaches when
+                       it resumes at this phrase, with an extra entry for the end
+        The scan resumes after the verb of a phrase that is not coded, so it skips
+        any phrase between the (VP and a passive verb.
+        """
+        verblocs = [0] * len(ParseVerbs)
+        passives = [False] * len(ParseVerbs)
+        kskips = list(ParseVerbs)  # the scan resumes after these if not coded
+        for kvp, vpstart in enumerate(ParseVerbs):
+            if vpstart < ParseStart:
+                continue
             try:
-                pv = check_passive(kitem)
+                pv = check_passive(vpstart)
             except CheckVerbsError:
-                kitem += 1
                 continue
-            IsPassive = (pv > 0)
-            if IsPassive:
+            passives[kvp] = (pv > 0)
+            if passives[kvp]:
 #				print "Got passive"
-                kitem = pv - 2  # kitem + 2 is now at the passive verb
-            targ = ParseList[kitem + 2] + ' '
+                kverb = pv
+            else:
+                kverb = vpstart + 2
             if ShowPattMatch:
-                print("CV-0", targ)
-            if targ in PETRglobals.VerbDict:
-                SourceLoc = [-1, True]
-                TargetLoc = [-1, True]
-                if ShowPattMatch:
-                    print("CV-1 Found", targ)
-                endtag = '~' + ParseList[vpstart][1:]
-                hasmatch = False
-                if PETRglobals.VerbDict[targ][0]:
-                    patternlist = PETRglobals.VerbDict[targ]
-                    ka = 2
-                    # check for multi-word.
-                    while (ka < len(patternlist) and patternlist[ka][0]):
-                        if ShowPattMatch: print("CV/mult-1: Checking",targ, patternlist[ka])
-                        if make_multi_sequences(patternlist[ka][2], kitem+2, endtag):
-                            if ShowPattMatch: print("CV/mult-1: Found",targ, patternlist[ka])
-                            verbcode = patternlist[ka][0]  # save the default multi-word verb code
-                            patternlist = PETRglobals.VerbDict[patternlist[ka][1]]  # redirect to the list for the primary verb
-                            break
-                        ka += 1
-                    else:
-                        make_check_sequences(kitem+2, endtag)
-                        verbcode = patternlist[1]
-                else:
-                    patternlist = PETRglobals.VerbDict[PETRglobals.VerbDict[targ][2]]  # redirect from a synonym
-                    make_check_sequences(kitem+2, endtag)
-                    verbcode = PETRglobals.VerbDict[targ][1]
-                kpat = 2
-                if ShowPattMatch: print("CV-2 patlist", patternlist)
-                while kpat < len(patternlist):
-                    SourceLoc = [-1,True] ; TargetLoc = [-1,True]
-                    if ShowPattMatch: print("CV-2: Checking",targ, patternlist[kpat])
-                    if verb_pattern_match(patternlist[kpat][0], UpperSeq, True):
-                        if ShowPattMatch: print("Found upper pattern match")   # debug
-                        if verb_pattern_match(patternlist[kpat][1], LowerSeq, False):
-                            if ShowPattMatch: print("Found lower pattern match")   # debug
-                            EventCode = patternlist[kpat][2]
-                            hasmatch = True
-                            break
-                    kpat += 1
-                if hasmatch and EventCode == '---':
-                    hasmatch = False
-                if not hasmatch and verbcode != '---':
-                    if ShowPattMatch:
-                        print("Matched on the primary verb")   # debug
-#                       EventCode = PETRglobals.VerbDict[targ][1]
-                    EventCode = verbcode
+                print("CV-0", ParseList[kverb] + ' ')
+            if ParseList[kverb] + ' ' in PETRglobals.VerbDict:
+                verblocs[kvp] = kverb
+            else:
+                kskips[kvp] = kverb - 2
+        nextverbs = [len(ParseVerbs)] * (len(ParseVerbs) + 1)
+        for kvp in range(len(ParseVerbs) - 1, -1, -1):
+            if verblocs[kvp]:
+                nextverbs[kvp] = kvp
+            else:
+                nextverbs[kvp] = nextverbs[bisect.bisect_right(ParseVerbs, kskips[kvp])]
+        return verblocs, passives, nextverbs
+
+    verblocs, passives, nextverbs = get_verb_candidates()
+    kvp = nextverbs[bisect.bisect_left(ParseVerbs, ParseStart)]
+    while kvp < len(ParseVerbs):
+        vpstart = ParseVerbs[kvp]
+        IsPassive = passives[kvp]
+        kitem = verblocs[kvp] - 2  # kitem + 2 is the verb
+        targ = ParseList[kitem + 2] + ' '
+        SourceLoc = [-1, True]
+        TargetLoc = [-1, True]
+        if ShowPattMatch:
+            print("CV-1 Found", targ)
+        endtag = '~' + ParseList[vpstart][1:]
+        hasmatch = False
+        if PETRglobals.VerbDict[targ][0]:
+            patternkey = targ
+            patternlist = PETRglobals.VerbDict[targ]
+            ka = 2
+            # check for multi-word.
+            while (ka < len(patternlist) and patternlist[ka][0]):
+                if ShowPattMatch: print("CV/mult-1: Checking",targ, patternlist[ka])
+                if make_multi_sequences(patternlist[ka][2], kitem+2, endtag):
+                    if ShowPattMatch: print("CV/mult-1: Found",targ, patternlist[ka])
+                    verbcode = patternlist[ka][0]  # save the default multi-word verb code
+                    patternkey = patternlist[ka][1]
+                    patternlist = PETRglobals.VerbDict[patternkey]  # redirect to the list for the primary verb
+                    break
+                ka += 1
+            else:
+                make_check_sequences(kitem+2, endtag)
+                verbcode = patternlist[1]
+        else:
+            patternkey = PETRglobals.VerbDict[targ][2]
+            patternlist = PETRglobals.VerbDict[patternkey]  # redirect from a synonym
+            make_check_sequences(kitem+2, endtag)
+            verbcode = PETRglobals.VerbDict[targ][1]
+        if ShowPattMatch: print("CV-2 patlist", patternlist)
+        if (patternkey in PETRglobals.VerbMatchers and
+                not PETRglobals.DictProfileFileName):  # compiled patterns
+            kpat = match_verb_patterns(PETRglobals.VerbMatchers[patternkey])
+            if kpat > 0:
+                if ShowPattMatch: print("Found pattern match", patternlist[kpat])   # debug
+                EventCode = patternlist[kpat][2]
+                hasmatch = True
+        else:
+            kpat = 2
+            while kpat < len(patternlist):
+                SourceLoc = [-1,True] ; TargetLoc = [-1,True]
+                if ShowPattMatch: print("CV-2: Checking",targ, patternlist[kpat])
+                starttime = time.time()
+                matched = False
+                if verb_pattern_match(patternlist[kpat][0], UpperSeq, True):
+                    if ShowPattMatch: print("Found upper pattern match")   # debug
+                    if verb_pattern_match(patternlist[kpat][1], LowerSeq, False):
+                        if ShowPattMatch: print("Found lower pattern match")   # debug
+                        matched = True
+                if PETRglobals.DictProfileFileName:
+                    count_dictionary_entry('verb', patternkey, kpat, matched,
+                                           time.time() - starttime)
+                if matched:
+                    EventCode = patternlist[kpat][2]
                     hasmatch = True
+                    break
+                kpat += 1
+        if hasmatch and EventCode == '---':
+            hasmatch = False
+        if not hasmatch and verbcode != '---':
+            if ShowPattMatch:
+                print("Matched on the primary verb")   # debug
+#                       EventCode = PETRglobals.VerbDict[targ][1]
+            EventCode = verbcode
+            hasmatch = True
 
-                if hasmatch:
-                    if SourceLoc[0] < 0:
-                        find_source()
+        if hasmatch:
+            if SourceLoc[0] < 0:
+                find_source()
+            if ShowPattMatch:
+                print("CV-3 src", SourceLoc)
+            if SourceLoc[0] >= 0:
+                if TargetLoc[0] < 0:
+                    find_target()
+                if TargetLoc[0] >= 0:
                     if ShowPattMatch:
-                        print("CV-3 src", SourceLoc)
-                    if SourceLoc[0] >= 0:
-                        if TargetLoc[0] < 0:
-                            find_target()
-                        if TargetLoc[0] >= 0:
-                            if ShowPattMatch:
-                                print("CV-3 tar", TargetLoc)
-                            make_event_strings()
-
-                if hasmatch:
-                    while (endtag not in ParseList[kitem]):
-                        kitem += 1  # resume search past the end of VP
-        kitem += 1
+                        print("CV-3 tar", TargetLoc)
+                    make_event_strings()
+
+        if hasmatch:
+            while (endtag not in ParseList[kitem]):
+                kitem += 1  # resume search past the end of VP
+        kvp = nextverbs[bisect.bisect_right(ParseVerbs, kitem)]
 
 
 """def get_actor_code(index):
@@ -1876,41 +2384,43 @@ def check_verbs():
     return '---' 	# if no condition is satisfied, return a null code;"""
 
 def get_actor_code(index):
-    """ Get the actor code, resolving date restrictions. """
-    global SentenceOrdDate
+    """
+    Get the actor code, resolving date restrictions using PETRglobals.ActorCodeIndex or
+    the actor store; codes with date restrictions are cached in ActorCodeCache by
+    (index, SentenceOrdDate). Sets ActorCodeDated.
+    """
+    global SentenceOrdDate, ActorCodeDated
 
     logger = logging.getLogger('petr_log')
 
-    thecode = None
     try:
-        codelist = PETRglobals.ActorCodes[index]
+        if PETRreader.ActorStorePath:
+            entry = PETRreader.get_store_entry('codes', index)
+            if entry is None:
+                raise IndexError
+            resolved, actorroot = entry
+        else:
+            resolved = PETRglobals.ActorCodeIndex[index]
     except IndexError:
         logger.warning('\tError processing actor in get_actor_code. Index: {}'.format(index))
-        thecode = '---'
-    if len(codelist) == 1 and len(codelist[0]) == 1:
-        thecode = codelist[0][0]  # no restrictions: the most common case
-    for item in codelist:
-#        print("GAC-1",index, item)  # debug
-        if len(item) > 1:  # interval date restriction
-            if item[0] == 0 and SentenceOrdDate <= item[1]:
-                thecode = item[2]
-                break
-            if item[0] == 1 and SentenceOrdDate >= item[1]:
-                thecode = item[2]
-                break
-            if item[0] == 2 and SentenceOrdDate >= item[1] and SentenceOrdDate <= item[2]:
-                thecode = item[3]
-                break
-    # if interval search failed, look for an unrestricted code
-    if not thecode:
-        for item in codelist:  # assumes even if PETRglobals.WriteActorRoot, the actor name at the end of the list will have length >1 if
-            if len(item) == 1:
-                thecode = item[0]
+        raise NameError('Actor code index {} not found'.format(index))  # handled in code_record()
+    ActorCodeDated = isinstance(resolved, tuple)
+    if ActorCodeDated:  # date restrictions
+        key = (index, SentenceOrdDate)
+        if key in ActorCodeCache:
+            thecode = ActorCodeCache[key]
+        else:
+            thecode = resolved[1][bisect.bisect_right(resolved[0], SentenceOrdDate)]
+            ActorCodeCache[key] = thecode
+    else:
+        thecode = resolved
 
     if not thecode:
         thecode = '---'
     elif PETRglobals.WriteActorRoot:
-        thecode += PETRglobals.RootPrimer + codelist[-1]
+        if not PETRreader.ActorStorePath:
+            actorroot = PETRglobals.ActorCodes[index][-1]
+        thecode += PETRglobals.RootPrimer + actorroot
 
     return thecode
 
@@ -1967,6 +2477,83 @@ def actor_phrase_match(patphrase, phrasefrag):
     )
 
 
+def match_phrase_trie(trie, phrase, kstart):
+    """
+    Returns the index of the first pattern -- in the order of the ActorDict or AgentDict
+    list the trie was compiled from by PETRreader.make_phrase_trie() -- which matches
+    phrase[kstart:], or None if there is no match. This gives the same result as calling
+    actor_phrase_match() on each pattern in the list until one succeeds, but walks the
+    words shared by the patterns only once.
+    """
+    best = None
+    stack = [(trie, kstart + 1)]   # already know first word matched
+    while stack:
+        node, kfrag = stack.pop()
+        if best is not None and node[1] >= best:
+            continue   # nothing in this branch precedes the current match
+        if node[0] is not None and (best is None or node[0] < best):
+            best = node[0]
+        if node[2] and kfrag < len(phrase) and phrase[kfrag] in node[2]:
+            stack.append((node[2][phrase[kfrag]], kfrag + 1))
+        if node[3]:  # intervening words are allowed: use first occurrence of each word
+            found = {}
+            for ka in range(kfrag, len(phrase)):
+                if phrase[ka] in node[3] and phrase[ka] not in found:
+                    found[phrase[ka]] = True
+                    stack.append((node[3][phrase[ka]], ka + 1))
+    return best
+
+
+def profile_phrase_match(kind, patlist, phrase, kstart):
+    """
+    Profiling version of match_phrase_trie(): tries the patterns in patlist in turn
+    with actor_phrase_match(), recording each in DictProfile.
+    """
+    phrasefrag = phrase[kstart:]
+    for index in range(len(patlist)):
+        starttime = time.time()
+        matched = actor_phrase_match(patlist[index], phrasefrag)
+        count_dictionary_entry(kind, phrase[kstart], index, matched, time.time() - starttime)
+        if matched:
+            return index
+    return None
+
+
+def has_actor_codes(nephrase):
+    """
+    Returns False if an actor pattern starting with a word of nephrase has a code index
+    that get_actor_code() can't find; assign_NEcodes() then codes the phrase at once
+    rather than leaving it to resolve_NEcode(), so the NameError is raised at the same
+    point as without PETRglobals.LazyNECoding.
+    """
+    for word in nephrase:
+        entry = get_phrase_entry('actor', word)
+        if entry:
+            for phlist in entry[1]:
+                if PETRreader.ActorStorePath:
+                    if PETRreader.get_store_entry('codes', phlist[0]) is None:
+                        return False
+                elif phlist[0] >= len(PETRglobals.ActorCodeIndex):
+                    return False
+    return True
+
+
+def get_phrase_entry(kind, word):
+    """
+    Returns the pair (trie, patlist) for the patterns starting with word in the actor or
+    agent dictionary, as kind is 'actor' or 'agent', or None if there are none. These
+    come from PETRreader.get_store_entry() when the actor store is open.
+    """
+    if PETRreader.ActorStorePath:
+        return PETRreader.get_store_entry('phrases', (kind, word))
+    if kind == 'actor':
+        if word in PETRglobals.ActorTrie:
+            return PETRglobals.ActorTrie[word], PETRglobals.ActorDict[word]
+    elif word in PETRglobals.AgentTrie:
+        return PETRglobals.AgentTrie[word], PETRglobals.AgentDict[word]
+    return None
+
+
 def check_NEphrase(nephrase):
     """
     This function tries to find actor and agent patterns matching somewhere in
@@ -1995,24 +2582,23 @@ def check_NEphrase(nephrase):
         print("CNEPh initial phrase", nephrase)  # debug
     # iterate through the phrase looking for actors
     while kword < len(nephrase):
-        phrasefrag = nephrase[kword:]
         if ShowNEParsing:
-            print("CNEPh Actor Check", phrasefrag[0])  # debug
+            print("CNEPh Actor Check", nephrase[kword])  # debug
         # check whether patterns starting with this word exist in the dictionary
-        if phrasefrag[0] in PETRglobals.ActorDict:
+        entry = get_phrase_entry('actor', nephrase[kword])
+        if entry:
             if ShowNEParsing:
-                print("                Found", phrasefrag[0])  # debug
-            patlist = PETRglobals.ActorDict[nephrase[kword]]
-            if ShowNEParsing:
-                print("CNEPh Mk1:", patlist)
-            # iterate over the patterns beginning with this word
-            for index in range(len(patlist)):
-                if actor_phrase_match(patlist[index], phrasefrag):
-                    # found a coded actor
-                    actorcode = get_actor_code(patlist[index][0])
-                    if ShowNEParsing:
-                        print("CNEPh Mk2:", actorcode)
-                    break
+                print("                Found", nephrase[kword])  # debug
+            if PETRglobals.DictProfileFileName:
+                index = profile_phrase_match('actor', entry[1], nephrase, kword)
+            else:
+                index = match_phrase_trie(entry[0], nephrase, kword)
+            if index is not None:
+                # found a coded actor
+                patlist = entry[1]
+                actorcode = get_actor_code(patlist[index][0])
+                if ShowNEParsing:
+                    print("CNEPh Mk2:", actorcode)
         if len(actorcode) > 0:
             break   # stop after finding first actor
         else:
@@ -2021,20 +2607,21 @@ def check_NEphrase(nephrase):
     kword = 0
     agentlist = []
     while kword < len(nephrase):  # now look for agents
-        phrasefrag = nephrase[kword:]
         if ShowNEParsing:
-            print("CNEPh Agent Check", phrasefrag[0])  # debug
+            print("CNEPh Agent Check", nephrase[kword])  # debug
         # check whether patterns starting with this word exist in the
         # dictionary
-        if phrasefrag[0] in PETRglobals.AgentDict:
+        entry = get_phrase_entry('agent', nephrase[kword])
+        if entry:
             if ShowNEParsing:
-                print("                Found", phrasefrag[0])  # debug
-            patlist = PETRglobals.AgentDict[nephrase[kword]]
-            # iterate over the patterns beginning with this word
-            for index in range(len(patlist)):
-                if actor_phrase_match(patlist[index], phrasefrag):
-                    agentlist.append(patlist[index][0])   # found a coded actor
-                    break
+                print("                Found", nephrase[kword])  # debug
+            if PETRglobals.DictProfileFileName:
+                index = profile_phrase_match('agent', entry[1], nephrase, kword)
+            else:
+                index = match_phrase_trie(entry[0], nephrase, kword)
+            if index is not None:
+                patlist = entry[1]
+                agentlist.append(patlist[index][0])   # found a coded actor
         kword += 1   # continue looking for more agents
 
     if len(agentlist) == 0:
@@ -2076,6 +2663,46 @@ def check_NEphrase(nephrase):
     return [True, actorcode]
 
 
+def lookup_NEphrase(nephrase):
+    """
+    Returns check_NEphrase(nephrase), using the result kept in NEPhraseCache if the
+    phrase has been seen before: wire stories repeat the same phrases constantly.
+
+    Results are keyed on PETRglobals.WriteActorRoot and the words of the phrase. If the
+    actor code had date restrictions, that key instead holds None and the result is
+    kept under (key, SentenceOrdDate). At most PETRglobals.NEPhraseCacheSize entries
+    are kept, dropping the least recently used; NEPhraseCacheStats counts the hits and
+    misses. The cache is not used when the dictionary profile is being collected,
+    since that counts every match.
+    """
+    global ActorCodeDated
+
+    if PETRglobals.NEPhraseCacheSize <= 0 or PETRglobals.DictProfileFileName:
+        return check_NEphrase(nephrase)
+
+    phrasekey = (PETRglobals.WriteActorRoot, tuple(nephrase))
+    cachekey = phrasekey
+    if phrasekey in NEPhraseCache and NEPhraseCache[phrasekey] is None:
+        NEPhraseCache[phrasekey] = NEPhraseCache.pop(phrasekey)  # now the most recent
+        cachekey = (phrasekey, SentenceOrdDate)
+    if cachekey in NEPhraseCache:
+        NEPhraseCacheStats[0] += 1
+        result = NEPhraseCache.pop(cachekey)  # re-inserted as the most recent
+        NEPhraseCache[cachekey] = result
+        return result
+
+    NEPhraseCacheStats[1] += 1
+    ActorCodeDated = False
+    result = check_NEphrase(nephrase)
+    if ActorCodeDated and cachekey == phrasekey:
+        NEPhraseCache[phrasekey] = None
+        cachekey = (phrasekey, SentenceOrdDate)
+    while len(NEPhraseCache) >= PETRglobals.NEPhraseCacheSize:
+        NEPhraseCache.popitem(last=False)
+    NEPhraseCache[cachekey] = result
+    return result
+
+
 def check_commas():
     """
     Removes comma-delimited clauses from ParseList.
@@ -2101,10 +2728,10 @@ def check_commas():
         cwkt = 0
         ka = loclow
         while ka < lochigh:
-            if ParseList[ka] == '(NE':
+            if ParseKinds[ka] == OpenToken and ParseTags[ka] == NETag:
                 ka += 2  # skip over codes
             else:
-                if ParseList[ka][0] != '(' and ParseList[ka][0] != '~' and ParseList[ka][0].isalpha():
+                if ParseKinds[ka] < OpenToken and ParseList[ka][0].isalpha():
                     cwkt += 1
                 ka += 1
 # print "cw/cc-1:", loclow, lochigh, cwkt   # debug
@@ -2116,7 +2743,7 @@ def check_commas():
         last element without ~
         """
         ka = len(ParseList) - 1
-        while ka >= 2 and ParseList[ka][0] == '~':
+        while ka >= 2 and ParseKinds[ka] == CloseToken:
             ka -= 1
 # print "cc/fe:",ParseList[ka-1:ka+2]   # debug
         return ka - 1
@@ -2130,22 +2757,25 @@ def check_commas():
         when these are completely within the clause being removed. This will potentially
         leave the tree in something of a mess grammatically, but it will be balanced.
 
-        [Since you are wondering, we go through this in reverse in order to use index(),
-        as there is no rindex() for lists.]
+        [Since you are wondering, we go through this in reverse so that a deletion doesn't
+        shift the locations that remain to be checked; the end of each phrase comes from
+        ParseMates.]
         """
         global ParseList  # 14.05.02: wtf is this needed??
 #		print 'dph/CC:',ParseList[loclow:lochigh]
         stack = []  # of course we use a stack...this is a tree...
         ka = lochigh - 1
         while ka >= loclow:
-            if ParseList[ka][0] == '~':
+            if ParseKinds[ka] == CloseToken:
                 stack.append(ParseList[ka][1:])
 #				print 'push:',stack
             # remove this complete phrase
-            elif len(stack) > 0 and ParseList[ka][0] == '(' and ParseList[ka][1:] == stack[-1]:
-                targ = '~' + ParseList[ka][1:]
-                ParseList = ParseList[:ka] + \
-                    ParseList[ParseList.index(targ, ka + 1) + 1:]
+            elif len(stack) > 0 and ParseKinds[ka] == OpenToken and ParseList[ka][1:] == stack[-1]:
+                if ParseMates[ka] > 0:
+                    kend = ka + ParseMates[ka]
+                else:
+                    kend = ParseList.index('~' + ParseList[ka][1:], ka + 1)
+                delete_ParseList(ka, kend + 1)
 #				print 'pop:',stack,'\n',ParseList[loclow]
                 stack.pop()
             ka -= 1
@@ -2226,7 +2856,7 @@ def check_commas():
     ka = ParseList.index('(,')   # initial
     if count_word(2, ka) == 0:
 #		print "%%--",ParseList[ka:ka+3]
-        ParseList = ParseList[:ka] + ParseList[ka + 3:]
+        delete_ParseList(ka, ka + 3)
 
     kend = find_end()
     ka = kend - 1  # terminal: reverse search for '(,'
@@ -2235,7 +2865,7 @@ def check_commas():
     if ParseList[ka] == '(,':
         if count_word(ka + 1, kend) == 0:
 # print "##--",ParseList[ka:ka+3]
-            ParseList = ParseList[:ka] + ParseList[ka + 3:]
+            delete_ParseList(ka, ka + 3)
 
     if ShowCCtrees:
         print('chkcomma-end-Parselist::')
@@ -2247,9 +2877,18 @@ def check_commas():
         raise_ParseList_error('check_balance at end of check_comma()')
 
 
-def assign_NEcodes():
+def assign_NEcodes(coding=True):
     """
     Assigns non-null codes to NE phrases where appropriate.
+
+    If coding is False, the compounds are expanded and the phrases checked but only
+    those that could raise NameError in get_actor_code() are coded, as with
+    PETRglobals.LazyNECoding.
+
+    If PETRglobals.LazyNECoding is set, the compounds are still expanded here but the
+    phrases are only stored in NEPhrases, and each is coded by resolve_NEcode() the
+    first time its code is needed. Phrases that could raise a NameError in
+    get_actor_code() are still coded here: see has_actor_codes().
     """
 
     def expand_compound_element(kstart):
@@ -2294,7 +2933,7 @@ def assign_NEcodes():
                 newlist.extend(itemlist)
     #			print 'exCel3:',newlist
             ka += 1  # okay to increment since next item is (, or (CC
-        ParseList = ParseList[:kstart] + newlist + ParseList[kend + 1:]
+        ParseList[kstart:kend + 1] = newlist  # in place: the list isn't copied
     #	print 'exCel4:',ParseList
         return kstart + len(newlist)
 
@@ -2335,23 +2974,27 @@ def assign_NEcodes():
         newlist.append('~NEC')
         # insert a tell-tale here in case we need to further expand this
         newlist.append('~TLTL')
-        ParseList = ParseList[:kstart] + newlist + ParseList[kend + 1:]
+        ParseList[kstart:kend + 1] = newlist  # in place: the list isn't copied
     #	print 'exNEp3:',ParseList
+        ktltl = kstart + len(newlist) - 1
         if '(NEC' in newlist[1:-1]:  # expand next set of (NEC if it exists
             ka = kstart + 1
     #		print 'exNEp4:', ParseList[ka: ParseList.index('~TLTL',kstart)]
-            while '(NE' in ParseList[ka:ParseList.index('~TLTL', ka)]:
+            ktltl = ParseList.index('~TLTL', ka)
+            while '(NE' in ParseList[ka:ktltl]:
                 ka = expand_compound_element(ka)
+                ktltl = ParseList.index('~TLTL', ka)
     #			print 'exNEp5:', ParseList[ka: ParseList.index('~TLTL',ka)]
 
-        ParseList.remove('~TLTL')  # tell-tale is no longer needed
+        del ParseList[ktltl]  # tell-tale is no longer needed
 
     global ParseStart, ParseList
     global nephrase
 
+    NEPhrases.clear()
     kitem = ParseStart
     while kitem < len(ParseList):
-        if '(NE' == ParseList[kitem]:
+        if ParseKinds[kitem] == OpenToken and ParseTags[kitem] == NETag:
             if ShowNEParsing:
                 print("NE-0:", kitem, ParseList[kitem - 1:])
             nephrase = []
@@ -2361,7 +3004,7 @@ def assign_NEcodes():
             if kitem >= len(ParseList):
                 raise_ParseList_error('Bounds overflow in (NE search in assign_NEcodes')
 
-            while '~NE' != ParseList[kitem]:
+            while ParseKinds[kitem] != CloseToken or ParseTags[kitem] != NETag:
                 # <14.01.15> At present, read_TreeBank can leave (NNx in place
                 # in situations involving (PP and (NEC: so COMPOUND-07. This is
                 # a mildly kludgy workaround that insures a check_NEphrase gets
@@ -2377,9 +3020,12 @@ def assign_NEcodes():
 
             if '(NEC' in nephrase:
                 expand_compound_NEPhrase(kstart, kitem)
+                index_ParseList()
                 kitem = kstart - 1  # process the (NEs following the expansion
+            elif (PETRglobals.LazyNECoding or not coding) and has_actor_codes(nephrase):
+                NEPhrases[kcode] = nephrase
             else:
-                result = check_NEphrase(nephrase)
+                result = lookup_NEphrase(nephrase)
                 if result[0]:
                     ParseList[kcode] = result[1]
                     if ShowNEParsing:
@@ -2387,6 +3033,28 @@ def assign_NEcodes():
         kitem += 1
 
 
+def resolve_NEcode(kcode):
+    """
+    Returns the code of the (NE whose code is at ParseList[kcode], first coding the
+    phrase if assign_NEcodes() left it in NEPhrases; the code is then stored in
+    ParseList as it would have been by assign_NEcodes().
+    """
+    if kcode in NEPhrases:
+        result = lookup_NEphrase(NEPhrases.pop(kcode))
+        if result[0]:
+            ParseList[kcode] = result[1]
+            if ShowNEParsing:
+                print("Assigned", result[1])   # debug
+    return ParseList[kcode]
+
+
+def get_NEcode(nerec):
+    """ Returns the code in the UpperNE/LowerNE record of an (NE; see Note-1 """
+    if nerec[1] is None:
+        return resolve_NEcode(nerec[0] + 1)
+    return nerec[1]
+
+
 def make_event_strings():
     """
     Creates the set of event strings, handing compound actors and symmetric
@@ -2587,6 +3255,42 @@ def extract_Sentence_info(item):
 
 
 
+def get_upper_text():
+    """
+    Returns SentenceText.upper(), which is used for the case insensitive matching of
+    discards and issues; this is only computed once per sentence.
+    """
+    global SentenceUpper
+    if SentenceUpper[0] is not SentenceText:
+        SentenceUpper = [SentenceText, SentenceText.upper()]
+    return SentenceUpper[1]
+
+
+def scan_text_automaton(automaton, text, stopset=()):
+    """
+    Makes a single pass through text with an automaton from
+    PETRreader.make_text_automaton() and returns a dictionary from the index of each
+    string found to the location of its first occurrence. The scan ends as soon as
+    one of the strings in stopset is found.
+    """
+    goto, fail, output, lengths = automaton
+    found = {}
+    state = 0
+    kchar = 0
+    for ch in text:
+        kchar += 1
+        while state > 0 and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        if output[state]:
+            for kstr in output[state]:
+                if kstr not in found:
+                    found[kstr] = kchar - lengths[kstr]
+                    if kstr in stopset:
+                        return found
+    return found
+
+
 def check_discards():
     """
     Checks whether any of the discard phrases are in SentenceText, giving
@@ -2594,40 +3298,71 @@ def check_discards():
        0 : no matches
        1 : simple match
        2 : story match [+ prefix]
+    The phrases are located in a single scan using PETRglobals.DiscardMatcher; as
+    with str.find(), only the first occurrence of a phrase ending in '_' is checked
+    for the following blank or punctuation, and it does not match at the very end of
+    the text.
     """
-    global SentenceText
+    if len(PETRglobals.DiscardList) == 0:
+        return [0, '']
 
-    sent = SentenceText.upper()  # case insensitive matching
+    sent = get_upper_text()  # case insensitive matching
 
-#    print('++:',PETRglobals.DiscardList)
+    if PETRglobals.DictProfileFileName:
+        return profile_discards(sent)
 
-    for target in PETRglobals.DiscardList:  # check all of the '+' cases first
-        if target[0] == '+':
-            mtarg = target[1:]
+    automaton, targets = PETRglobals.DiscardMatcher
+    found = scan_text_automaton(automaton, sent)
+    storyhit = sentencehit = len(PETRglobals.DiscardList)
+    for kstr, loc in found.items():
+        kend = loc + automaton[3][kstr]
+        for kdisc in targets[kstr]:
+            target = PETRglobals.DiscardList[kdisc]
             if target[-1] == '_':
-                mtarg = mtarg[:-1]
-            loc = sent.find(mtarg)
-            if loc >= 0:
-                if target[-1] == '_':
-                    if sent[loc + len(mtarg)] in ' .!?':
-                        return [2, target]
-                else:
-                    return [2, target]
+                if kend >= len(sent) or sent[kend] not in ' .!?':
+                    continue
+            if target[0] == '+':
+                storyhit = min(storyhit, kdisc)
+            else:
+                sentencehit = min(sentencehit, kdisc)
+
+    if storyhit < len(PETRglobals.DiscardList):  # '+' cases have priority
+        return [2, PETRglobals.DiscardList[storyhit]]
+    if sentencehit < len(PETRglobals.DiscardList):
+        return [1, PETRglobals.DiscardList[sentencehit]]
+    return [0, '']
+
 
-    for target in PETRglobals.DiscardList:
-        if target[0] != '+':
+def profile_discards(sent):
+    """
+    Profiling version of check_discards(): each of the discard phrases is checked in
+    sent with str.find() and recorded in DictProfile.
+    """
+    storyhit = sentencehit = len(PETRglobals.DiscardList)
+    for kdisc, target in enumerate(PETRglobals.DiscardList):
+        starttime = time.time()
+        if target[0] == '+':
+            mtarg = target[1:]
+        else:
             mtarg = target
-            if target[-1] == '_':
-                mtarg = mtarg[:-1]
-#				print '--',target, mtarg
-            loc = sent.find(mtarg)
-            if loc >= 0:
-                if target[-1] == '_':
-#					print '-'+sent[loc+len(mtarg)]+'-'
-                    if sent[loc + len(mtarg)] in ' .!?':
-                        return [1, target]
-                else:
-                    return [1, target]
+        if target[-1] == '_':
+            mtarg = mtarg[:-1]
+        loc = sent.find(mtarg)
+        matched = loc >= 0
+        if matched and target[-1] == '_':
+            kend = loc + len(mtarg)
+            matched = kend < len(sent) and sent[kend] in ' .!?'
+        count_dictionary_entry('discard', target, kdisc, matched, time.time() - starttime)
+        if matched:
+            if target[0] == '+':
+                storyhit = min(storyhit, kdisc)
+            else:
+                sentencehit = min(sentencehit, kdisc)
+
+    if storyhit < len(PETRglobals.DiscardList):  # '+' cases have priority
+        return [2, PETRglobals.DiscardList[storyhit]]
+    if sentencehit < len(PETRglobals.DiscardList):
+        return [1, PETRglobals.DiscardList[sentencehit]]
     return [0, '']
 
 
@@ -2637,36 +3372,71 @@ def get_issues():
 
     <14.02.28> stops coding and sets the issues to zero if it finds *any*
     ignore phrase
+
+    All of the phrases are located in a single scan using PETRglobals.IssueMatcher;
+    the issues are then counted in the order of IssueList.
     """
-    global SentenceText
+    if len(PETRglobals.IssueList) == 0:
+        return []
 
-    sent = SentenceText.upper()  # case insensitive matching
+    sent = get_upper_text()  # case insensitive matching
     issues = []
 
-    for target in PETRglobals.IssueList:
-        if target[0] in sent:  # found the issue phrase
-            code = PETRglobals.IssueCodes[target[1]]
-            if code[0] == '~':  # ignore code, so bail
-                return []
-            ka = 0
-            gotcode = False
-            while ka < len(issues):
-                if code == issues[ka][0]:
-                    issues[ka][1] += 1
-                    break
-                ka += 1
-            if ka == len(issues):  # didn't find the code, so add it
-                issues.append([code, 1])
+    automaton, targets, ignores = PETRglobals.IssueMatcher
+    found = scan_text_automaton(automaton, sent, ignores)
+    if ignores.intersection(found):
+        return []  # ignore code, so bail
+
+    kissues = []
+    for kstr in found:
+        kissues.extend(targets[kstr])
+    kissues.sort()
+    for kissue in kissues:  # found the issue phrase
+        code = PETRglobals.IssueCodes[PETRglobals.IssueList[kissue][1]]
+        ka = 0
+        while ka < len(issues):
+            if code == issues[ka][0]:
+                issues[ka][1] += 1
+                break
+            ka += 1
+        if ka == len(issues):  # didn't find the code, so add it
+            issues.append([code, 1])
 
     return issues
 
 
+def has_verb_candidate():
+    """
+    Returns True if ParseList has a word following a (VBx or preceding a ~VBx that is
+    in VerbDict, which covers the multi-word verbs as well. check_verbs() only codes
+    these -- the active verb follows the (VBx at the start of the (VP and a passive
+    verb precedes a ~VBN -- and check_commas() and assign_NEcodes() can't add any, so
+    a sentence without one can't produce an event.
+    """
+    ka = 0
+    try:
+        while True:
+            ka = ParseTags.index(VBTag, ka) + 1  # next (VBx or ~VBx
+            if ParseKinds[ka - 1] == OpenToken:
+                if ParseList[ka] + ' ' in PETRglobals.VerbDict:
+                    return True
+            elif ParseList[ka - 2] + ' ' in PETRglobals.VerbDict:
+                return True
+    except (ValueError, IndexError):  # no more tags
+        return False
+
+
 def code_record():
     """
     Code using ParseList read_TreeBank, then return results in StoryEventList
     first element of StoryEventList for each sentence -- this signals the start
     of a list events for a sentence -- followed by lists containing
     source/target/event triples.
+
+    Sentences left without a verb from the dictionary by the comma deletion are
+    counted in NEmpty without coding their NE phrases or checking the verbs: see
+    has_verb_candidate(). The phrases are still checked by assign_NEcodes(), so a
+    parse error raises HasParseError as before.
     """
     global CodedEvents
     global ParseList
@@ -2682,12 +3452,16 @@ def code_record():
     except IndexError:
         raise_ParseList_error('Index error in check_commas()')
 
+    hasverb = has_verb_candidate()
     try:
-        assign_NEcodes()
+        assign_NEcodes(hasverb)
     except NameError:
         print(SentenceOrdDate)
     if ShowParseList:
         print('code_rec-Parselist::', ParseList)
+    if not hasverb:
+        NEmpty += 1
+        return
 
     try:
         check_verbs()   # this can throw HasParseError which is caught in do_coding
@@ -2704,6 +3478,186 @@ def code_record():
 
 
 
+# ================== DICTIONARY PROFILE ================== #
+
+
+def count_dictionary_entry(kind, key, kentry, matched, elapsed):
+    """
+    Records a trial of a dictionary entry in DictProfile, which is keyed on
+    (kind, key, kentry): kind is 'verb', 'actor', 'agent' or 'discard', key is the
+    VerbDict, ActorDict or AgentDict key or the discard phrase and kentry is the index
+    of the entry in the key's list, or in DiscardList. The values are
+    [tries, matches, seconds]. This is used when PETRglobals.DictProfileFileName is set,
+    which switches the coding to the pattern-at-a-time matching functions.
+    """
+    counts = DictProfile.get((kind, key, kentry))
+    if counts is None:
+        counts = DictProfile[(kind, key, kentry)] = [0, 0, 0.0]
+    counts[0] += 1
+    if matched:
+        counts[1] += 1
+    counts[2] += elapsed
+
+
+def merge_dictionary_profile(profile):
+    """ Adds the counts in profile, from a coding worker, to DictProfile """
+    for entrykey, counts in profile.items():
+        if entrykey in DictProfile:
+            total = DictProfile[entrykey]
+            total[0] += counts[0]
+            total[1] += counts[1]
+            total[2] += counts[2]
+        else:
+            DictProfile[entrykey] = list(counts)
+
+
+def get_entry_text(kind, key, kentry):
+    """ Returns the dictionary entry counted in DictProfile as (kind, key, kentry) as text """
+    try:
+        if kind == 'verb':
+            pattern = PETRglobals.VerbDict[key][kentry]
+            words = list(reversed(pattern[0][1::2])) + ['*'] + list(pattern[1][1::2])
+            return '{} [{}]'.format(' '.join(words), pattern[2])
+        if kind == 'discard':
+            return key
+        phlist = get_phrase_entry(kind, key)[1][kentry]
+    except (IndexError, KeyError, TypeError):
+        return '?'  # the dictionaries have changed since the entry was counted
+    phrase = key
+    connector = phlist[1]
+    for word, nextconn in phlist[2:]:
+        if word:
+            phrase += connector + word
+        connector = nextconn
+    return '{} [{}]'.format(phrase, phlist[0])
+
+
+def show_dictionary_profile(filename=''):
+# writes DictProfile to screen or to filename: totals for each verb, actor and agent key
+# followed by the individual entries, each sorted by the time spent
+    keytotals = {}
+    for (kind, key, kentry), counts in DictProfile.items():
+        total = keytotals.setdefault((kind, key), [0, 0, 0.0, 0])
+        total[0] += counts[0]
+        total[1] += counts[1]
+        total[2] += counts[2]
+        total[3] += 1
+
+    lines = ['{:<8}{:<36}{:>10}{:>10}{:>12}{:>9}'.format('Kind', 'Key', 'Tries',
+                                                         'Matches', 'Time (ms)', 'Entries')]
+    for (kind, key), total in sorted(keytotals.items(), key=lambda item: -item[1][2]):
+        lines.append('{:<8}{:<36}{:>10}{:>10}{:>12.2f}{:>9}'.format(
+            kind, key.strip(), total[0], total[1], total[2] * 1000, total[3]))
+    lines.append('')
+    lines.append('{:<8}{:>10}{:>10}{:>12}   {}'.format('Kind', 'Tries', 'Matches',
+                                                       'Time (ms)', 'Entry'))
+    for (kind, key, kentry), counts in sorted(DictProfile.items(),
+                                              key=lambda item: -item[1][2]):
+        lines.append('{:<8}{:>10}{:>10}{:>12.2f}   {}'.format(
+            kind, counts[0], counts[1], counts[2] * 1000, get_entry_text(kind, key, kentry)))
+
+    if len(filename) > 0:
+        fout = io.open(filename, 'w', encoding='utf-8')
+        fout.write('PETRARCH Dictionary Profile\n')
+        fout.write('Run time: ' + PETRglobals.RunTimeString + '\n')
+        for line in lines:
+            fout.write(line + '\n')
+        fout.close()
+    else:
+        for line in lines:
+            print(line)
+
+
+# ================== PARSE FILTER ================== #
+
+
+def get_text_words(text):
+    """
+    Returns the set of upper-case words in the raw text, which includes the forms that
+    the parser might produce -- with and without the surrounding punctuation, and split
+    at apostrophes and hyphens -- so that it is a superset of the words in the parse.
+    """
+    words = set()
+    for word in text.upper().split():
+        words.add(word)
+        word = word.strip('.,;:!?"`()[]{}<>')
+        words.add(word)
+        words.update(re.split("[-'/]", word))
+        if "'" in word:
+            words.add(word[word.find("'"):])  # 'S, N'T and the like
+    words.discard('')
+    return words
+
+
+def filter_parse_input(event_dict):
+    """
+    Checks the sentences that utilities.stanford_parse() would send to the parser and
+    sets 'parse_filtered' for those that can't produce an event: these have no word
+    that is a verb in VerbDict -- the multi-word verbs are keyed on their verb -- or,
+    when events need a coded source and target and new actors are not extracted, no
+    word that begins an actor or agent phrase. stanford_parse() then skips these, unless
+    PETRglobals.ParseFilterShadow is set, in which case everything is parsed and
+    show_parse_filter_recall() reports how many of the filtered sentences produced
+    events. The counts are kept in ParseFilterCounts.
+    """
+    logger = logging.getLogger('petr_log')
+    verbs = set(key[:-1] for key in PETRglobals.VerbDict if key.endswith(' '))
+    needactor = PETRglobals.RequireDyad and PETRglobals.NewActorLength == 0
+
+    ParseFilterCounts[:] = [0, 0]
+    for key in event_dict:
+        for sent in event_dict[key]['sents']:
+            sent_dict = event_dict[key]['sents'][sent]
+            if sent_dict.get('parsed') or not 64 <= len(sent_dict['content']) <= 512:
+                continue  # as in stanford_parse()
+            ParseFilterCounts[0] += 1
+            words = get_text_words(sent_dict['content'])
+            codable = not verbs.isdisjoint(words)
+            if codable and needactor:
+                codable = any(get_phrase_entry('actor', word) or
+                              get_phrase_entry('agent', word) for word in words)
+            if not codable:
+                sent_dict['parse_filtered'] = True
+                ParseFilterCounts[1] += 1
+
+    if PETRglobals.ParseFilterShadow:
+        message = 'Parse filter (shadow): {} of {} sentences would not be parsed'
+    else:
+        message = 'Parse filter: {} of {} sentences will not be parsed'
+    message = message.format(ParseFilterCounts[1], ParseFilterCounts[0])
+    print(message)
+    logger.info(message)
+    return event_dict
+
+
+def show_parse_filter_recall(event_dict):
+    """
+    After coding with PETRglobals.ParseFilterShadow set, reports the recall of
+    filter_parse_input(): the share of the sentences that produced events which it
+    would have sent to the parser.
+    """
+    logger = logging.getLogger('petr_log')
+    nevents = 0
+    nmissed = 0
+    for key in event_dict:
+        if not event_dict[key]['sents']:
+            continue
+        for sent, sent_dict in event_dict[key]['sents'].items():
+            if sent_dict.get('events'):
+                nevents += 1
+                if sent_dict.get('parse_filtered'):
+                    nmissed += 1
+                    logger.info('Parse filter missed {}_{}'.format(key, sent))
+    if nevents > 0:
+        recall = 100.0 * (nevents - nmissed) / nevents
+    else:
+        recall = 100.0
+    message = ('Parse filter (shadow): {} of {} sentences with events would not have been '
+               'parsed; recall {:.1f}%'.format(nmissed, nevents, recall))
+    print(message)
+    logger.info(message)
+
+
 def do_validation(filepath):
     """ Unit tests using a validation file. """
     nvalid = 0
@@ -2775,19 +3729,29 @@ def do_coding(event_dict, out_file):
     #TODO: Change this
     global treestr, ParseList
 
+    if PETRglobals.CodingProcesses > 1 and not CodingWorker:
+        return do_coding_parallel(event_dict, out_file)
+
     NStory = 0
     NSent = 0
     NEvents = 0
     NEmpty = 0
     NDiscardSent = 0
     NDiscardStory = 0
+    ActorCodeCache.clear()
+    if not CodingWorker:  # workers keep theirs across the blocks of stories
+        NEPhraseCache.clear()
+    NEPhraseCacheStats[:] = [0, 0]
 
     logger = logging.getLogger('petr_log')
     for key in event_dict:
+        if DictionaryReload is not None and not CodingWorker:
+            swap_dictionaries(False)  # only between stories
         SkipStory = False
         logger.info('Processing {}'.format(key))
         print('Processing {}'.format(key))
         StoryDate = event_dict[key]['meta']['date']
+        StoryOrdDate = None  # computed at the first parsed sentence
         StorySource = 'TEMP'
         for sent in event_dict[key]['sents']:
             if 'parsed' in event_dict[key]['sents'][sent]:
@@ -2795,7 +3759,9 @@ def do_coding(event_dict, out_file):
                 logger.info('\tProcessing {}'.format(SentenceID))
                 SentenceText = event_dict[key]['sents'][sent]['content']
                 SentenceDate = StoryDate
-                SentenceOrdDate = PETRreader.dstr_to_ordate(SentenceDate)
+                if StoryOrdDate is None:
+                    StoryOrdDate = PETRreader.dstr_to_ordate(StoryDate)
+                SentenceOrdDate = StoryOrdDate
                 SentenceSource = 'TEMP'
 
                 parsed = event_dict[key]['sents'][sent]['parsed']
@@ -2867,12 +3833,123 @@ def do_coding(event_dict, out_file):
         if SkipStory:
             event_dict[key]['sents'] = None
 
-    print("Summary:")
-    print("Stories read:", NStory, "   Sentences coded:", NSent, "  Events generated:", NEvents)
-    print("Discards:  Sentence", NDiscardSent, "  Story", NDiscardStory, "  Sentences without events:", NEmpty)
+    if not CodingWorker:
+        show_coding_summary()
+        if PETRglobals.DictProfileFileName:
+            show_dictionary_profile(PETRglobals.DictProfileFileName)
+    return event_dict
+
+
+def show_coding_summary(filename=''):
+    """ Prints the story, sentence and event counts from the last do_coding() run. """
+    if filename:
+        fout = open(filename, 'w')
+    else:
+        fout = sys.stdout
+    print("Summary:", file=fout)
+    print("Stories read:", NStory, "   Sentences coded:", NSent, "  Events generated:", NEvents, file=fout)
+    print("Discards:  Sentence", NDiscardSent, "  Story", NDiscardStory, "  Sentences without events:", NEmpty, file=fout)
+    nlookup = NEPhraseCacheStats[0] + NEPhraseCacheStats[1]
+    if nlookup > 0:
+        print("NE phrase cache:  Hits", NEPhraseCacheStats[0], "  Misses", NEPhraseCacheStats[1],
+              "  Hit rate: {:.1f}%".format(100.0 * NEPhraseCacheStats[0] / nlookup), file=fout)
+    if filename:
+        fout.close()
+
+
+def code_story_block(keys):
+    """
+    Worker side of do_coding_parallel(): codes the stories in keys, which are read
+    from the copy of WorkerEvents inherited from the parent, and returns them with
+    the worker's counts.
+    """
+    global CodingWorker
+
+    CodingWorker = True
+    block = {}
+    for key in keys:
+        block[key] = WorkerEvents[key]
+    DictProfile.clear()
+    do_coding(block, 'TEMP')
+    return (block, [NStory, NSent, NEvents, NDiscardSent, NDiscardStory, NEmpty], DictProfile,
+            NEPhraseCacheStats)
+
 
+def do_coding_parallel(event_dict, out_file):
+    """
+    Codes event_dict in PETRglobals.CodingProcesses forked worker processes.
+
+    The workers are forked after read_dictionaries(), so they inherit the
+    dictionaries and the stories in WorkerEvents without loading or copying them:
+    each worker receives only a list of story keys and sends back the coded
+    stories, which are merged into event_dict. See freeze_dictionaries() for
+    how far the inherited pages stay shared. A reload_dictionaries() under way is
+    swapped in between blocks of stories, by forking the workers again.
+
+    Falls back to do_coding() in a single process on platforms without fork().
+    """
+    global WorkerEvents
+    global NStory, NSent, NEvents, NDiscardSent, NDiscardStory, NEmpty
+
+    keys = list(event_dict)
+    nproc = min(PETRglobals.CodingProcesses, len(keys))
+    if nproc < 2 or not hasattr(os, 'fork'):
+        nprocesses = PETRglobals.CodingProcesses
+        PETRglobals.CodingProcesses = 1
+        try:
+            return do_coding(event_dict, out_file)
+        finally:
+            PETRglobals.CodingProcesses = nprocesses
+
+    # several blocks per worker so that a slow block doesn't hold up the rest
+    blocksize = max(1, len(keys) // (4 * nproc))
+    blocks = [keys[ka:ka + blocksize] for ka in range(0, len(keys), blocksize)]
+
+    WorkerEvents = event_dict
+    results = []
+    kblock = 0
+    try:
+        while kblock < len(blocks):
+            # the workers are forked again once reload_dictionaries() has a new set,
+            # after the blocks under way are finished with the old one
+            swap_dictionaries(False)
+            NEPhraseCache.clear()  # so the workers start from an empty cache and counts
+            NEPhraseCacheStats[:] = [0, 0]
+            freeze_dictionaries()
+            pool = multiprocessing.Pool(nproc)
+            try:
+                pending = collections.deque()
+                while True:
+                    while (kblock < len(blocks) and len(pending) < 2 * nproc and
+                           not reload_ready()):
+                        pending.append(pool.apply_async(code_story_block, (blocks[kblock],)))
+                        kblock += 1
+                    if not pending:
+                        break
+                    results.append(pending.popleft().get())
+            finally:
+                pool.close()
+                pool.join()
+                unfreeze_dictionaries()
+    finally:
+        WorkerEvents = {}
+
+    counts = [0, 0, 0, 0, 0, 0]
+    NEPhraseCacheStats[:] = [0, 0]
+    for block, blockcounts, profile, cachestats in results:
+        event_dict.update(block)
+        counts = [ka + kb for ka, kb in zip(counts, blockcounts)]
+        merge_dictionary_profile(profile)
+        NEPhraseCacheStats[0] += cachestats[0]
+        NEPhraseCacheStats[1] += cachestats[1]
+    NStory, NSent, NEvents, NDiscardSent, NDiscardStory, NEmpty = counts
+
+    show_coding_summary()
+    if PETRglobals.DictProfileFileName:
+        show_dictionary_profile(PETRglobals.DictProfileFileName)
     return event_dict
 
+
 def parse_cli_args():
     """Function to parse the command-line arguments for PETRARCH."""
     __description__ = """
@@ -2981,39 +4058,173 @@ def main():
 
 
 def read_dictionaries():
+        PETRreader.reset_dictionaries()
+
         print('Verb dictionary:', PETRglobals.VerbFileName)
         verb_path = utilities._get_data('data/dictionaries',
                                         PETRglobals.VerbFileName)
-        PETRreader.read_verb_dictionary(verb_path)
+        dictionary_files = [('verb', verb_path)]
 
         print('Actor dictionaries:', PETRglobals.ActorFileList)
-        for actdict in PETRglobals.ActorFileList:
-            actor_path = utilities._get_data('data/dictionaries', actdict)
-            PETRreader.read_actor_dictionary(actor_path)
-
+        actor_paths = [utilities._get_data('data/dictionaries', actdict)
+                       for actdict in PETRglobals.ActorFileList]
         print('Agent dictionary:', PETRglobals.AgentFileName)
         agent_path = utilities._get_data('data/dictionaries',
                                          PETRglobals.AgentFileName)
-        PETRreader.read_agent_dictionary(agent_path)
+        if not PETRglobals.ActorStoreName:
+            dictionary_files.extend([('actor', actor_path) for actor_path in actor_paths])
+            dictionary_files.append(('agent', agent_path))
 
 
         print('Discard dictionary:', PETRglobals.DiscardFileName)
         discard_path = utilities._get_data('data/dictionaries',
                                            PETRglobals.DiscardFileName)
-        PETRreader.read_discard_list(discard_path)
+        dictionary_files.append(('discard', discard_path))
 
         if PETRglobals.IssueFileName != "":
             print('Issues dictionary:', PETRglobals.IssueFileName)
             issue_path = utilities._get_data('data/dictionaries',
                                              PETRglobals.IssueFileName)
-            PETRreader.read_issue_list(issue_path)
+            dictionary_files.append(('issue', issue_path))
+
+        PETRreader.read_dictionary_list(dictionary_files)
+        if PETRglobals.ActorStoreName:
+            PETRreader.open_actor_store(actor_paths, agent_path)
+
+
+def load_dictionary_set(conn):
+    """
+    Worker for reload_dictionaries(): reads the dictionaries in the background process
+    and sends None through conn followed by PETRreader.get_dictionary_set(), pickled,
+    or the error if they could not be read.
+    """
+    PETRglobals.LoadProcesses = 1  # a daemonic process can't start a pool of its own
+    try:
+        read_dictionaries()
+        dictdata = pickle.dumps(PETRreader.get_dictionary_set(), pickle.HIGHEST_PROTOCOL)
+    except SystemExit:  # the readers exit on missing files
+        conn.send('Dictionaries could not be read')
+    except Exception as e:
+        conn.send(str(e))
+    else:
+        conn.send(None)
+        conn.send_bytes(dictdata)
+    conn.close()
+
+
+def reload_dictionaries():
+    """
+    Starts reading the dictionary files set in PETRglobals again in a background
+    process, so that edits to them are picked up without a restart. do_coding() swaps
+    in the new dictionaries between stories once they are ready, so the sentences of
+    the current story are finished with the old ones, and do_coding_parallel() between
+    blocks of stories; swap_dictionaries() does this directly. Without fork(), the
+    dictionaries are read and swapped in immediately.
+    """
+    global DictionaryReload
+
+    if DictionaryReload is not None:
+        return  # already under way
+    if not hasattr(os, 'fork'):
+        read_dictionaries()
+        ActorCodeCache.clear()
+        NEPhraseCache.clear()
+        return
+    conn, childconn = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(target=load_dictionary_set, args=(childconn,))
+    process.daemon = True
+    process.start()
+    childconn.close()  # so that conn sees the end of the pipe if the process dies
+    DictionaryReload = [process, conn]
+
+
+def reload_ready():
+    """ Returns True if swap_dictionaries() can replace the dictionaries without waiting """
+    return DictionaryReload is not None and DictionaryReload[1].poll()
+
+
+def swap_dictionaries(wait=True):
+    """
+    Replaces the dictionaries with the ones read by reload_dictionaries(), waiting for
+    these if wait is True. Returns True if the dictionaries were replaced; if they
+    could not be read, the current ones are kept.
+
+    The old dictionaries are released and collected before the new ones are
+    unpickled, and the new ones are received and unpickled in this thread rather than
+    in a pool's result thread, whose malloc arena would keep the memory: so memory
+    stays at about one set of dictionaries across reloads.
+    """
+    global DictionaryReload
+
+    if DictionaryReload is None:
+        return False
+    if not wait and not reload_ready():
+        return False
+    process, conn = DictionaryReload
+    DictionaryReload = None
+    logger = logging.getLogger('petr_log')
+    try:
+        error = conn.recv()
+        if error is None:
+            dictdata = conn.recv_bytes()
+    except EOFError:
+        error = 'the reading process exited without sending them'
+    finally:
+        conn.close()
+        process.join()
+    if error is not None:
+        logger.warning('Dictionary reload failed: {}'.format(error))
+        print('Dictionary reload failed:', error)
+        return False
+    PETRreader.reset_dictionaries()
+    ActorCodeCache.clear()
+    NEPhraseCache.clear()
+    gc.collect()  # the old set has reference cycles
+    PETRreader.set_dictionary_set(pickle.loads(dictdata))
+    dictdata = None
+    logger.info('Dictionaries reloaded')
+    return True
+
+
+def freeze_dictionaries():
+    """
+    Moves the dictionaries out of the way of the garbage collector, so that
+    collections in the workers forked by do_coding_parallel() don't touch, and
+    therefore copy, their pages; unfreeze_dictionaries() undoes this once the
+    workers have finished.
+
+    A collection at this point untracks the tuples and dicts that hold only
+    strings and numbers -- most of the compacted dictionaries -- and promotes the
+    rest to the oldest generation; gc.freeze() then removes those from collection
+    altogether. gc.freeze() only exists in Python 3.7+: on Python 2.7 only the
+    untracking is done, and a full collection in a worker still touches the
+    dictionary containers that remain tracked. On either version, reference
+    counting writes to the objects that a worker uses, so those pages are copied.
+    """
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def unfreeze_dictionaries():
+    """
+    Returns the objects frozen by freeze_dictionaries() to the oldest generation, so
+    that the ones released later -- e.g. a set of dictionaries replaced by
+    swap_dictionaries() -- can be collected.
+    """
+    if hasattr(gc, 'unfreeze'):
+        gc.unfreeze()
 
 
 def run(filepaths, out_file, s_parsed):
     events = PETRreader.read_xml_input(filepaths, s_parsed)
     if not s_parsed:
+        if PETRglobals.ParseFilter or PETRglobals.ParseFilterShadow:
+            events = filter_parse_input(events)
         events = utilities.stanford_parse(events)
     updated_events = do_coding(events, 'TEMP')
+    if not s_parsed and PETRglobals.ParseFilterShadow:
+        show_parse_filter_recall(updated_events)
     PETRwriter.write_events(updated_events, out_file)
 
 
@@ -3040,8 +4251,12 @@ def run_pipeline(data, out_file=None, config=None, write_output=True,
         logger.info('Hitting do_coding')
         updated_events = do_coding(events, 'TEMP')
     else:
+        if PETRglobals.ParseFilter or PETRglobals.ParseFilterShadow:
+            events = filter_parse_input(events)
         events = utilities.stanford_parse(events)
         updated_events = do_coding(events, 'TEMP')
+        if PETRglobals.ParseFilterShadow:
+            show_parse_filter_recall(updated_events)
     if not write_output:
         output_events = PETRwriter.pipe_output(updated_events)
         return output_events
@@ -35,7 +35,9 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import os
+import re
 import logging
+import datetime as dt
 import corenlp
 import dateutil.parser
 import PETRglobals
@@ -64,6 +66,8 @@ def stanford_parse(event_dict):
             if len(sent_dict['content']) > 512 or len(sent_dict['content']) < 64:
                 logger.warning('\tText length wrong. Either too long or too short.')
                 pass
+            elif sent_dict.get('parse_filtered') and not PETRglobals.ParseFilterShadow:
+                logger.info('\tNo verb or actor from the dictionaries: not parsed.')
             else:
                 try:
                     stanford_result = core.raw_parse(sent_dict['content'])
@@ -151,10 +155,43 @@ def _format_parsed_str(parsed_str):
     return treestr
 
 
+# YYYYMMDD and ISO-8601 dates, which _format_datestr() converts without dateutil
+DatePattern = re.compile(r'(?:(\d{4})(\d{2})(\d{2})|(\d{4})-(\d{2})-(\d{2})'
+                         r'(?:[T ](?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d+)?)?'
+                         r'(?:Z|[+-]\d{2}:?\d{2})?)?)$')
+DateStrCache = {}  # memo of _format_datestr(); cleared when it reaches DateStrCacheSize
+DateStrCacheSize = 10000
+
+
 def _format_datestr(date):
-    datetime = dateutil.parser.parse(date)
-    date = '{}{:02}{:02}'.format(datetime.year, datetime.month, datetime.day)
-    return date
+    """
+    Converts date to a YYYYMMDD string. YYYYMMDD and ISO-8601 dates are sliced
+    directly; anything else goes through dateutil.parser.parse.
+    """
+    if date in DateStrCache:
+        return DateStrCache[date]
+    match = DatePattern.match(date)
+    try:
+        # dateutil keeps the date as written, whatever the time zone
+        datetime = dt.date(*[int(part) for part in match.groups() if part])
+    except (AttributeError, ValueError):  # not in either format, or invalid
+        datetime = dateutil.parser.parse(date)
+    datestr = '{}{:02}{:02}'.format(datetime.year, datetime.month, datetime.day)
+    if len(DateStrCache) >= DateStrCacheSize:
+        DateStrCache.clear()
+    DateStrCache[date] = datestr
+    return datestr
+
+
+def _format_datestrs(dates):
+    """
+    Batch version of _format_datestr(): returns the list of YYYYMMDD strings for
+    dates, converting each distinct date only once.
+    """
+    converted = {}
+    for date in set(dates):
+        converted[date] = _format_datestr(date)
+    return [converted[date] for date in dates]
 
 
 def _get_data(dir_path, path):
@@ -0,0 +1,38 @@
+import pytest
+
+from petrarch import petrarch, PETRglobals, PETRreader, utilities
+
+
+CONFIG = utilities._get_data('data/config/', 'PETR_config.ini')
+
+
+def read_dictionary_set(**options):
+    """
+    Reads the dictionaries with the default config and the PETRglobals options in
+    options, and returns them as PETRreader.get_dictionary_set() does.
+    """
+    PETRreader.parse_Config(CONFIG)
+    for name, value in options.items():
+        setattr(PETRglobals, name, value)
+    petrarch.read_dictionaries()
+    return PETRreader.get_dictionary_set()
+
+
+@pytest.fixture(autouse=True)
+def restore_globals():
+    """ Restores the PETRglobals options and dictionaries changed by a test """
+    saved = dict(vars(PETRglobals))
+    dictset = PETRreader.get_dictionary_set()
+    yield
+    vars(PETRglobals).update(saved)
+    PETRreader.set_dictionary_set(dictset)
+
+
+@pytest.fixture(scope='session')
+def plain_dictionaries():
+    """ The dictionaries read from the text files, without any of the options """
+    saved = dict(vars(PETRglobals))
+    try:
+        return read_dictionary_set(DictCacheDir='', LoadProcesses=1)
+    finally:
+        vars(PETRglobals).update(saved)
@@ -0,0 +1,245 @@
+import pytest
+
+from petrarch import petrarch, PETRglobals, PETRreader, utilities
+
+from conftest import CONFIG, read_dictionary_set
+
+
+SAMPLE = utilities._get_data('data/text', 'GigaWord.sample.PETR.xml')
+
+
+def code_sample(dictionaries, **options):
+    """
+    Codes the GigaWord sample with dictionaries and the PETRglobals options in
+    options, and returns the events and issues of each sentence.
+    """
+    PETRreader.set_dictionary_set(dictionaries)
+    for name, value in options.items():
+        setattr(PETRglobals, name, value)
+    event_dict = petrarch.do_coding(PETRreader.read_xml_input([SAMPLE], True), 'TEMP')
+    coded = {}
+    for key in event_dict:
+        for sent, sent_dict in (event_dict[key]['sents'] or {}).items():
+            coded[(key, sent)] = (sent_dict.get('events'), sent_dict.get('issues'))
+    return coded
+
+
+def get_counts():
+    """ Returns the coding counts of the last call of do_coding() """
+    return [petrarch.NStory, petrarch.NSent, petrarch.NEvents, petrarch.NDiscardSent,
+            petrarch.NDiscardStory, petrarch.NEmpty]
+
+
+DISCARD_TEXTS = [
+    ('They met in group a.', [1, ' GROUP A_']),
+    ('They met in group a today', [1, ' GROUP A_']),
+    ('They played group abc', [0, '']),
+    ('They met group ab and group a.', [0, '']),  # only the first occurrence is checked
+    # a '_' phrase at the very end of the text is not matched; the linear scan of
+    # the baseline raised IndexError here
+    ('They met in group a', [0, '']),
+    ('They met group ab and group a', [0, '']),
+]
+
+
+@pytest.mark.parametrize('text,result', DISCARD_TEXTS)
+def test_check_discards(monkeypatch, plain_dictionaries, text, result):
+    PETRreader.set_dictionary_set(plain_dictionaries)
+    monkeypatch.setattr(petrarch, 'SentenceText', text)
+    assert petrarch.check_discards() == result
+
+
+@pytest.mark.parametrize('text,result', DISCARD_TEXTS)
+def test_profile_discards(monkeypatch, plain_dictionaries, text, result):
+    PETRreader.set_dictionary_set(plain_dictionaries)
+    monkeypatch.setattr(petrarch, 'SentenceText', text)
+    monkeypatch.setattr(petrarch, 'DictProfile', {})
+    monkeypatch.setattr(PETRglobals, 'DictProfileFileName', 'profile.txt')
+    assert petrarch.check_discards() == result
+    assert len(petrarch.DictProfile) == len(PETRglobals.DiscardList)
+
+
+def test_parallel_coding(plain_dictionaries):
+    single = code_sample(plain_dictionaries, CodingProcesses=1)
+    counts = get_counts()
+    assert any(events for events, issues in single.values())
+    nlookup = sum(petrarch.NEPhraseCacheStats)
+    # the workers must not start from the cache of an earlier run
+    petrarch.NEPhraseCache[('NOT A PHRASE', 0)] = None
+    assert code_sample(plain_dictionaries, CodingProcesses=2) == single
+    assert get_counts() == counts
+    assert sum(petrarch.NEPhraseCacheStats) == nlookup
+    assert len(petrarch.NEPhraseCache) == 0
+
+
+def test_lazy_ne_coding(plain_dictionaries):
+    eager = code_sample(plain_dictionaries, LazyNECoding=False)
+    counts = get_counts()
+    assert code_sample(plain_dictionaries, LazyNECoding=True) == eager
+    assert get_counts() == counts
+
+
+def test_lazy_ne_coding_with_bad_actor_index(plain_dictionaries):
+    # get_actor_code() raises NameError for the later half of the actors, which stops
+    # the NE coding of a sentence at the first such phrase with either setting
+    actorindex = plain_dictionaries['ActorCodeIndex']
+    actorindex = actorindex[:len(actorindex) // 2]
+    eager = code_sample(plain_dictionaries, LazyNECoding=False, ActorCodeIndex=actorindex)
+    counts = get_counts()
+    assert eager != code_sample(plain_dictionaries, LazyNECoding=False)
+    assert code_sample(plain_dictionaries, LazyNECoding=True,
+                       ActorCodeIndex=actorindex) == eager
+    assert get_counts() == counts
+
+
+def test_verb_check_keeps_events(monkeypatch, plain_dictionaries):
+    coded = code_sample(plain_dictionaries)
+    counts = get_counts()
+    assert counts[5] > 0
+    monkeypatch.setattr(petrarch, 'has_verb_candidate', lambda: True)
+    assert code_sample(plain_dictionaries) == coded
+    assert get_counts() == counts
+
+
+def test_verb_check_keeps_parse_errors(monkeypatch, plain_dictionaries):
+    def check_commas():
+        petrarch.raise_ParseList_error('test')
+
+    monkeypatch.setattr(petrarch, 'check_commas', check_commas)
+    monkeypatch.setattr(petrarch, 'has_verb_candidate', lambda: False)
+    coded = code_sample(plain_dictionaries)
+    assert not any(events for events, issues in coded.values())
+    assert get_counts()[5] == 0  # the sentences are not counted as empty
+
+
+def unparse_sample():
+    """
+    Returns the GigaWord sample without the parses, which are returned in a dict
+    keyed on (key, sent) so that they can be put back as utilities.stanford_parse()
+    would.
+    """
+    event_dict = PETRreader.read_xml_input([SAMPLE], True)
+    parses = {}
+    for key in event_dict:
+        for sent, sent_dict in event_dict[key]['sents'].items():
+            parses[(key, sent)] = sent_dict.pop('parsed')
+    # a sentence that the filter drops, which has no parse to put back
+    event_dict[key]['sents']['99'] = {'content': 'Lorem ipsum dolor amet consectetur '
+                                                 'adipiscing elit eiusmod tempor labore.'}
+    return event_dict, parses
+
+
+def test_parse_filter_shadow(monkeypatch, plain_dictionaries):
+    coded = code_sample(plain_dictionaries)
+    counts = get_counts()
+    PETRreader.set_dictionary_set(plain_dictionaries)
+    monkeypatch.setattr(PETRglobals, 'ParseFilterShadow', True)
+    event_dict, parses = unparse_sample()
+    petrarch.filter_parse_input(event_dict)
+    assert 1 <= petrarch.ParseFilterCounts[1] < petrarch.ParseFilterCounts[0]
+    for (key, sent), parsed in parses.items():
+        event_dict[key]['sents'][sent]['parsed'] = parsed
+    event_dict = petrarch.do_coding(event_dict, 'TEMP')
+    assert get_counts() == counts
+    for (key, sent), (events, issues) in coded.items():
+        sent_dict = event_dict[key]['sents'][sent]
+        assert sent_dict.get('events') == events
+        assert sent_dict.get('issues') == issues
+        if events:  # the sample has no sentence with events that the filter drops
+            assert not sent_dict.get('parse_filtered')
+
+
+def read_config():
+    """ Sets the options of the default config, with which the dictionaries are read """
+    PETRreader.parse_Config(CONFIG)
+    PETRglobals.DictCacheDir = ''
+    PETRglobals.LoadProcesses = 1
+
+
+@pytest.mark.parametrize('nproc', [1, 2])
+def test_reload_before_coding(plain_dictionaries, nproc):
+    read_config()
+    plain = code_sample(plain_dictionaries)
+    noverbs = dict(plain_dictionaries, VerbDict={})
+    petrarch.reload_dictionaries()
+    assert petrarch.DictionaryReload[1].poll(60)
+    assert code_sample(noverbs, CodingProcesses=nproc) == plain
+    assert petrarch.DictionaryReload is None
+    assert PETRreader.get_dictionary_set() == plain_dictionaries
+
+
+def test_reload_between_blocks(monkeypatch, plain_dictionaries):
+    read_config()
+    plain = code_sample(plain_dictionaries)
+    noverbs = dict(plain_dictionaries, VerbDict={})
+    ncalls = []
+
+    def reload_ready():  # ready once two blocks have been handed to the workers
+        ncalls.append(1)
+        return (len(ncalls) > 3 and petrarch.DictionaryReload is not None and
+                petrarch.DictionaryReload[1].poll(60))
+
+    petrarch.reload_dictionaries()
+    monkeypatch.setattr(petrarch, 'reload_ready', reload_ready)
+    coded = code_sample(noverbs, CodingProcesses=2)
+    assert petrarch.DictionaryReload is None
+    withevents = set(key for key, sent in plain if plain[(key, sent)][0])
+    reloaded = set(key for key, sent in plain if coded[(key, sent)][0])
+    assert 0 < len(reloaded) < len(withevents)
+    for key, sent in plain:  # each story is coded with one set of dictionaries
+        if key in reloaded:
+            assert coded[(key, sent)] == plain[(key, sent)]
+        else:
+            assert not coded[(key, sent)][0]
+
+
+@pytest.mark.parametrize('nproc', [1, 2])
+def test_dictionary_profile(tmpdir, monkeypatch, plain_dictionaries, nproc):
+    coded = code_sample(plain_dictionaries)
+    counts = get_counts()
+    monkeypatch.setattr(petrarch, 'DictProfile', {})
+    profile = str(tmpdir.join('profile.txt'))
+    assert code_sample(plain_dictionaries, DictProfileFileName=profile,
+                       CodingProcesses=nproc) == coded
+    assert get_counts() == counts
+    kinds = set(kind for kind, key, kentry in petrarch.DictProfile)
+    assert kinds == set(['verb', 'actor', 'agent', 'discard'])
+    for tries, matches, seconds in petrarch.DictProfile.values():
+        assert tries >= matches >= 0
+    assert sum(counts[1] for counts in petrarch.DictProfile.values()) > 0
+    with open(profile) as fin:
+        lines = fin.read().splitlines()
+    assert lines[0] == 'PETRARCH Dictionary Profile'
+    assert len(lines) > len(petrarch.DictProfile)
+
+
+def test_dictionary_profile_of_workers(tmpdir, monkeypatch, plain_dictionaries):
+    profiles = []
+    for nproc in [1, 2]:
+        monkeypatch.setattr(petrarch, 'DictProfile', {})
+        code_sample(plain_dictionaries, DictProfileFileName=str(tmpdir.join('profile.txt')),
+                    CodingProcesses=nproc)
+        profiles.append(dict((entrykey, counts[:2])
+                             for entrykey, counts in petrarch.DictProfile.items()))
+    assert profiles[0] == profiles[1]
+
+
+@pytest.fixture(scope='module')
+def store_dictionaries(tmpdir_factory):
+    """ The dictionaries with the actors and agents in an actor store """
+    storepath = str(tmpdir_factory.mktemp('store').join('actors.sqlite'))
+    saved = dict(vars(PETRglobals))
+    try:
+        return read_dictionary_set(DictCacheDir='', LoadProcesses=1, ActorStoreName=storepath)
+    finally:
+        vars(PETRglobals).update(saved)
+
+
+@pytest.mark.parametrize('cachesize,nproc', [(20000, 1), (10, 1), (0, 1), (20000, 2)])
+def test_actor_store_coding(plain_dictionaries, store_dictionaries, cachesize, nproc):
+    coded = code_sample(plain_dictionaries)
+    counts = get_counts()
+    assert code_sample(store_dictionaries, ActorStoreCacheSize=cachesize,
+                       CodingProcesses=nproc) == coded
+    assert get_counts() == counts
+    assert len(PETRreader.ActorStoreCache) <= cachesize
@@ -0,0 +1,164 @@
+import glob
+import os
+import shutil
+
+from petrarch import PETRglobals, PETRreader, utilities
+
+from conftest import read_dictionary_set
+
+
+def test_cache_matches_text_files(tmpdir, plain_dictionaries):
+    cachedir = str(tmpdir)
+    written = read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1)
+    assert len(glob.glob(os.path.join(cachedir, '*.pickle'))) == 7
+    loaded = read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1)
+    assert written == plain_dictionaries
+    assert loaded == plain_dictionaries
+
+
+def test_cache_keeps_snapshots_for_other_options(tmpdir):
+    cachedir = str(tmpdir)
+    read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1, WriteActorRoot=True)
+    read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1, WriteActorRoot=False)
+    for actorfile in PETRglobals.ActorFileList:
+        assert len(glob.glob(os.path.join(cachedir, actorfile + '.actor.*'))) == 2
+    # the files are not read again with either setting
+    before = sorted(os.listdir(cachedir))
+    mtimes = [os.path.getmtime(os.path.join(cachedir, name)) for name in before]
+    read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1, WriteActorRoot=True)
+    assert sorted(os.listdir(cachedir)) == before
+    assert [os.path.getmtime(os.path.join(cachedir, name)) for name in before] == mtimes
+
+
+def test_cache_replaces_snapshot_of_edited_file(tmpdir):
+    cachedir = str(tmpdir.mkdir('cache'))
+    discards = str(tmpdir.join('discards.txt'))
+    shutil.copy(utilities._get_data('data/dictionaries', 'Phoenix.discards.txt'), discards)
+    read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1, DiscardFileName=discards)
+    with open(discards, 'a') as fout:
+        fout.write('\n+PETRARCH TEST DISCARD\n')
+    read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1, DiscardFileName=discards)
+    assert len(glob.glob(os.path.join(cachedir, 'discards.txt.discard.*'))) == 1
+    assert 'PETRARCH TEST DISCARD' in ' '.join(PETRglobals.DiscardList)
+
+
+def test_parallel_load_matches_text_files(monkeypatch, plain_dictionaries):
+    monkeypatch.setattr(PETRreader.multiprocessing, 'cpu_count', lambda: 4)
+    assert read_dictionary_set(DictCacheDir='', LoadProcesses=4) == plain_dictionaries
+
+
+def test_parallel_load_fills_cache(tmpdir, monkeypatch, plain_dictionaries):
+    monkeypatch.setattr(PETRreader.multiprocessing, 'cpu_count', lambda: 4)
+    cachedir = str(tmpdir)
+    read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=4)
+    assert len(glob.glob(os.path.join(cachedir, '*.pickle'))) == 7
+    assert read_dictionary_set(DictCacheDir=cachedir, LoadProcesses=1) == plain_dictionaries
+
+
+def test_compaction_keeps_actor_entries():
+    path = utilities._get_data('data/dictionaries', 'Phoenix.International.actors.txt')
+    PETRreader.reset_dictionaries()
+    PETRreader.read_actor_dictionary(path)
+    actors = dict(PETRglobals.ActorDict)
+    codes = list(PETRglobals.ActorCodes)
+    actordict, actorcodes = PETRreader.read_dictionary_fragment('actor', path)[:2]
+    assert actordict == dict((key, [tuple(phlist) for phlist in patlist])
+                             for key, patlist in actors.items())
+    assert actorcodes == [tuple(tuple(item) for item in codelist) for codelist in codes]
+
+
+def test_compaction_shares_words():
+    path = utilities._get_data('data/dictionaries', 'Phoenix.agents.txt')
+    agentdict, agenttrie = PETRreader.read_dictionary_fragment('agent', path)
+    words = {}
+    for patlist in agentdict.values():
+        for phlist in patlist:
+            for word, connector in phlist[2:]:
+                assert words.setdefault(word, word) is word
+    stack = list(agenttrie.values())
+    while stack:  # the tries are built from the same words
+        node = stack.pop()
+        for branch in node[2:]:
+            for word, child in branch.items():
+                assert words[word] is word
+                stack.append(child)
+
+
+def test_dictionary_lines_keep_line_numbers(tmpdir):
+    path = tmpdir.join('lines.txt')
+    path.write('\n'.join(['# comment',
+                          'FIRST',
+                          '',
+                          'SECOND  # trailing comment',
+                          '<!-- a comment',
+                          'over lines -->',
+                          'THIRD',
+                          'FOURTH <!-- inline --> END']) + '\n')
+    expected = []
+    PETRreader.open_FIN(str(path), 'test')
+    try:
+        line = PETRreader.read_FIN_line()
+        while line:
+            expected.append((PETRreader.FINnline, line))
+            line = PETRreader.read_FIN_line()
+    except EOFError:
+        pass
+    PETRreader.close_FIN()
+    assert [kline for kline, line in expected] == [2, 4, 6, 7, 8]
+
+    found = []
+    dictlines = PETRreader.read_dictionary_lines(str(path), 'test')
+    line = PETRreader.next_dictionary_line(dictlines)
+    while line:
+        found.append((PETRreader.FINnline, PETRreader.FINline))
+        line = PETRreader.next_dictionary_line(dictlines)
+    assert found == expected
+    assert PETRreader.CurrentFINname == str(path)
+
+
+def test_actor_store_matches_dictionaries(tmpdir, plain_dictionaries):
+    storepath = str(tmpdir.join('actors.sqlite'))
+    stored = read_dictionary_set(DictCacheDir='', LoadProcesses=1, ActorStoreName=storepath)
+    assert stored['ActorStorePath'] == storepath
+    assert stored['ActorDict'] == {} and stored['AgentDict'] == {}
+    assert stored['VerbDict'] == plain_dictionaries['VerbDict']
+    for kind, dictname, triename in [('actor', 'ActorDict', 'ActorTrie'),
+                                     ('agent', 'AgentDict', 'AgentTrie')]:
+        for word, patlist in plain_dictionaries[dictname].items():
+            entry = PETRreader.get_store_entry('phrases', (kind, word))
+            assert entry == (plain_dictionaries[triename][word], patlist)
+        assert PETRreader.get_store_entry('phrases', (kind, 'NOT A WORD')) is None
+    actorindex = plain_dictionaries['ActorCodeIndex']
+    for kcode, resolved in enumerate(actorindex):
+        assert PETRreader.get_store_entry('codes', kcode) == (resolved, None)
+    assert PETRreader.get_store_entry('codes', len(actorindex)) is None
+    assert len(PETRreader.ActorStoreCache) == PETRglobals.ActorStoreCacheSize
+
+    mtime = os.path.getmtime(storepath)  # the store is not built again
+    read_dictionary_set(DictCacheDir='', LoadProcesses=1, ActorStoreName=storepath)
+    assert os.path.getmtime(storepath) == mtime
+
+
+def test_actor_store_without_cache(tmpdir, plain_dictionaries):
+    storepath = str(tmpdir.join('actors.sqlite'))
+    read_dictionary_set(DictCacheDir='', LoadProcesses=1, ActorStoreName=storepath,
+                        ActorStoreCacheSize=0)
+    for word in list(plain_dictionaries['AgentDict'])[:100]:
+        entry = PETRreader.get_store_entry('phrases', ('agent', word))
+        assert entry[1] == plain_dictionaries['AgentDict'][word]
+    assert len(PETRreader.ActorStoreCache) == 0
+
+
+def test_actor_store_rebuilt_for_edited_file(tmpdir):
+    storepath = str(tmpdir.join('actors.sqlite'))
+    agents = str(tmpdir.join('agents.txt'))
+    shutil.copy(utilities._get_data('data/dictionaries', 'Phoenix.agents.txt'), agents)
+    read_dictionary_set(DictCacheDir='', LoadProcesses=1, ActorStoreName=storepath,
+                        AgentFileName=agents)
+    assert PETRreader.get_store_entry('phrases', ('agent', 'PETRARCHTEST')) is None
+    with open(agents, 'a') as fout:
+        fout.write('\nPETRARCHTEST [~TST]\n')
+    read_dictionary_set(DictCacheDir='', LoadProcesses=1, ActorStoreName=storepath,
+                        AgentFileName=agents)
+    assert PETRreader.get_store_entry('phrases', ('agent', 'PETRARCHTEST')) is not None
+    assert not glob.glob(storepath + '.*')  # the new store replaced the old one